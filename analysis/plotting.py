@@ -117,6 +117,22 @@ def plot_ten(foldername, num=1000):
     plt.show()
 
 
+def read_times(filename):
+    """ Returns the total time taken by each generation recorded in a time.txt file
+
+    Files with a header row have a column for each phase of a generation and one
+    for the total, while older files hold just the total of each generation.
+    """
+
+    with open(filename, "r") as time_file:
+        rows = [line.split() for line in time_file if line.strip()]
+    column = 0
+    if rows and "total" in rows[0]:
+        column = rows[0].index("total")
+        rows = rows[1:]
+    return [float(row[column]) for row in rows]
+
+
 def time_average(foldername, num=1000):
     # Set up plot
     fig = plt.figure()
@@ -135,12 +151,9 @@ def time_average(foldername, num=1000):
         times = np.zeros(num + 1)
         for i in range(10):
             filename = "{}/{}/None{}/time.txt".format(foldername, optimisation.lower(), i)
-            time_file = open(filename, "r")
-            lines = time_file.readlines()
-            lines = [float(line) / 10 for line in lines][:num + 1]
+            lines = [time / 10 for time in read_times(filename)][:num + 1]
             lines = np.array(lines)
             times = times + lines
-            time_file.close()
 
         # Plot time line
         ax.plot(list(range(len(times))), times, linewidth=1.0, label=optimisation)
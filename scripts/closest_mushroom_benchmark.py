@@ -0,0 +1,56 @@
+""" This is a benchmark of the spatial indexes used by Environment.closest_mushroom()
+over different world sizes and mushroom densities. As in the simulation, each
+epoch resets the world and then calls closest_mushroom once per cycle, eating
+the closest mushroom every few cycles. The time per call includes the cost of
+maintaining the index through resets and meals.
+"""
+
+import random
+import time
+
+from simulating.environment import Environment
+from simulating.environment import SPATIAL_INDEXES
+
+SIZES = [20, 50, 100, 200]
+DENSITIES = [0.005, 0.05, 0.2]
+EPOCHS = 20
+CYCLES = 50
+CYCLES_PER_MEAL = 10
+
+
+def time_closest_mushroom(size, density, spatial_index):
+    """ Create a world and time calls to closest_mushroom, returning seconds per call """
+
+    num_mushrooms = max(10, int(size * size * density))
+    env = Environment(size, size, num_mushrooms // 2, num_mushrooms - num_mushrooms // 2,
+                      spatial_index=spatial_index)
+    positions = [env.random_position() for _ in range(CYCLES)]
+
+    time_start = time.time()
+
+    for _ in range(EPOCHS):
+        env.reset()
+        for cycle, pos in enumerate(positions):
+            mush_pos = env.closest_mushroom(pos)
+            if cycle % CYCLES_PER_MEAL == 0:
+                env.clear_cell(mush_pos)
+
+    time_end = time.time()
+    return (time_end - time_start) / (EPOCHS * CYCLES)
+
+
+print("{:>6} {:>8} {:>10}".format("Size", "Density", "Mushrooms"), end="")
+for name in SPATIAL_INDEXES:
+    print(" {:>12}".format(name + " (us)"), end="")
+print()
+
+for world_size in SIZES:
+    for world_density in DENSITIES:
+        print("{:>6} {:>8} {:>10}".format(world_size, world_density,
+                                          max(10, int(world_size * world_size * world_density))),
+              end="")
+        for name in SPATIAL_INDEXES:
+            random.seed(0)
+            print(" {:>12.2f}".format(time_closest_mushroom(world_size, world_density, name) * 1e6),
+                  end="")
+        print()
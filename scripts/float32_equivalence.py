@@ -0,0 +1,64 @@
+""" This is a check that evolving populations with float32 parameters gives the
+same fitness curves as with float64 parameters. For each seed, a population is
+evolved in both modes and the average fitness of each generation is recorded.
+The curves need not match exactly, as rounding differs, so instead the final
+fitness of the two modes is compared over the seeds with a Mann-Whitney U test
+and, where any seed differs, a paired Wilcoxon test. The mean curves are printed
+side by side, along with the number of seeds whose curves are identical.
+"""
+
+import random
+
+import numpy as np
+from scipy import stats
+
+from simulating.entity import NetworkConfig
+from simulating.entity import NeuralEntity
+from simulating.simulation import Simulation
+
+SEEDS = range(10)
+NUM_ENTITIES = 50
+NUM_GENERATIONS = 30
+LAST_GENERATIONS = 5
+
+
+def fitness_curve(seed, dtype):
+    """ Evolve a population and return the average fitness of each generation """
+
+    random.seed(seed)
+    np.random.seed(seed)
+    sim = Simulation(15, 50, NUM_ENTITIES, NUM_GENERATIONS, "External", seed=seed)
+    config = NetworkConfig(dtype=dtype)
+    entities = [NeuralEntity(config=config) for _ in range(NUM_ENTITIES)]
+
+    curve = []
+    for _ in range(NUM_GENERATIONS):
+        for entity in entities:
+            sim.run_single(entity)
+        entities.sort(key=lambda entity: entity.fitness, reverse=True)
+        curve.append(sum(entity.fitness for entity in entities) / NUM_ENTITIES)
+        entities = sim.reproduce_population(entities)
+    return curve
+
+
+curves = {
+    dtype.__name__: np.array([fitness_curve(seed, dtype) for seed in SEEDS])
+    for dtype in [np.float64, np.float32]
+}
+
+print("{:>10} {:>10} {:>10}".format("Generation", "float64", "float32"))
+for generation in range(NUM_GENERATIONS):
+    print("{:>10} {:>10.2f} {:>10.2f}".format(generation, curves["float64"][:, generation].mean(),
+                                              curves["float32"][:, generation].mean()))
+
+# Compare the fitness reached by each seed, averaged over the last generations
+final64 = curves["float64"][:, -LAST_GENERATIONS:].mean(axis=1)
+final32 = curves["float32"][:, -LAST_GENERATIONS:].mean(axis=1)
+print()
+print("Mann-Whitney U p-value: {:.3f}".format(
+    stats.mannwhitneyu(final64, final32, alternative="two-sided").pvalue))
+print("Seeds with identical curves: {} of {}".format(
+    sum(np.array_equal(curve64, curve32)
+        for curve64, curve32 in zip(curves["float64"], curves["float32"])), len(SEEDS)))
+if (final64 != final32).any():
+    print("Wilcoxon signed-rank p-value: {:.3f}".format(stats.wilcoxon(final64, final32).pvalue))
@@ -1,75 +1,50 @@
-""" This is a benchmark test to show that the dictionary representation
-of the toy world is more efficienct than the array representation for the
-closest_mushroom() method, which involves iterating through all the mushrooms
-in the world
+""" This is a benchmark of the world representations on the full simulation loop.
+A population of random neural entities is run through Simulation.run_single for
+each environment and spatial index, in the same WorldBank of worlds for every
+configuration (generated before timing), and the time taken per generation is
+printed along with the total fitness (which is the same for configurations that
+break ties in the same way).
 """
 
 import time
-import random
-import matplotlib.pyplot as plt
 
+from simulating.entity import NeuralEntity
+from simulating.simulation import Simulation
 
-def list_of_positions():
-    """ Generate a list of world positions """
-    positions = []
-    while len(positions) != 20:
-        x = random.randrange(0, 20)
-        y = random.randrange(0, 20)
-        if (x, y) not in positions:
-            positions.append((x, y))
-    return positions
+CONFIGURATIONS = [("dict", "scan"), ("dict", "grid"), ("dict", "map"), ("grid", "scan"),
+                  ("grid", "map")]
+OPTIMISATIONS = ["none", "skip_none,skip_facing_out,detect_looping"]
+NUM_ENTITIES = 100
+REPEATS = 3
 
 
-def time_dictionary():
-    """ Create a dictionary world and iterate through to find each mushroom """
-    # Each mushroom is a key in the dictionary
-    world = {}
-    positions = list_of_positions()
-    for position in positions:
-        world[position] = random.randrange(1, 1000)
-
-    time_start = time.time()
-
-    # Iterate through the world,
-    # incrementing each "mushroom"
-    for position in world:
-        world[position] += 1
-
-    time_end = time.time()
-    return time_end - time_start
+def time_generation(entities, environment_type, spatial_index, optimisation):
+    """ Run each entity once and return the time taken and the total fitness """
 
-
-def time_array():
-    """ Create an array world and iterate through to find each mushroom """
-    # Each mushroom is a non-zero value in the 2D array
-    world = [[0 for _ in range(20)] for _ in range(20)]
-    positions = list_of_positions()
-    for (x, y) in positions:
-        world[x][y] = random.randrange(1, 1000)
+    sim = Simulation(15, 50, len(entities), 1, "None", optimisation=optimisation)
+    sim.set_world_options(environment_type=environment_type, spatial_index=spatial_index)
+    worlds = sim.make_world_bank(0)
 
     time_start = time.time()
 
-    # Iterate through the world,
-    # incrementing each "mushroom"
-    for x in range(20):
-        for y in range(20):
-            if world[x][y] > 0:
-                world[x][y] += 1
+    total_fitness = 0
+    for entity in entities:
+        total_fitness += sim.run_single(entity.copy(), worlds=worlds).fitness
 
     time_end = time.time()
-    return time_end - time_start
-
-
-total = 10000
-
-d_times = [time_dictionary() for _ in range(total)]
-d_mean = sum(d_times) / total
-d_var = sum([(t - d_mean)**2 for t in d_times]) / total
-a_times = [time_array() for _ in range(total)]
-a_mean = sum(a_times) / total
-a_var = sum([(t - a_mean)**2 for t in a_times]) / total
-
-print("DICTIONARY REPRESENTATION")
-print("Mean: {} \nVariance: {}\n".format(d_mean, d_var))
-print("ARRAY REPRESENTATION")
-print("Mean: {} \nVariance: {}".format(a_mean, a_var))
+    return time_end - time_start, total_fitness
+
+
+population = [NeuralEntity() for _ in range(NUM_ENTITIES)]
+
+for optimisation in OPTIMISATIONS:
+    print("OPTIMISATION: " + optimisation)
+    for environment, index in CONFIGURATIONS:
+        results = [time_generation(population, environment, index, optimisation)
+                   for _ in range(REPEATS)]
+        times = [t for t, _ in results]
+        mean = sum(times) / REPEATS
+        var = sum([(t - mean)**2 for t in times]) / REPEATS
+        print("{:>5} {:>5}   Mean: {:.4f}s   Variance: {:.2e}   Fitness: {}".format(
+            environment, index, mean, var, results[0][1]))
+    print()
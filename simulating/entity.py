@@ -10,6 +10,7 @@ or right or doing nothing.
 """
 
 import copy
+import itertools
 import random
 
 import numpy as np
@@ -21,9 +22,10 @@ from simulating import environment
 ENERGY_POISON = -11
 ENERGY_EDIBLE = 10
 
-# Control activation layers
+# Defaults of the network configuration, used for entities created without one
 ACTIVATION = "identity"
 LINEAR = False
+DTYPE = np.float64
 
 
 class Entity:
@@ -32,6 +34,9 @@ class Entity:
     Attributes:
         fitness: The current fitness of this entity.
     """
+
+    __slots__ = ["fitness"]
+
     def __init__(self, startFitness=0):
         """ Instantiation of an Entity
 
@@ -66,6 +71,26 @@ class Entity:
         """
         return Action.NOTHING, [0, 0, 0]
 
+    def batch_behaviour(self, inputs):
+        """ Given a matrix of perceptual inputs, returns an action and vocal for each column.
+
+        Calls behaviour once per column; subclasses may evaluate the batch at once.
+
+        Args:
+            inputs: Array of shape (14, B) as built by make_inputs
+        Returns:
+            (actions, vocals): Array of B action codes and (B, 3) array of vocal bits
+        """
+
+        actions = np.zeros(inputs.shape[1], dtype=int)
+        vocals = np.zeros((inputs.shape[1], 3), dtype=int)
+        for i, column in enumerate(inputs.T):
+            action, vocal = self.behaviour(column[0], array_to_bits(column[1:11]),
+                                           list(column[11:14]))
+            actions[i] = action.value
+            vocals[i] = vocal
+        return actions, vocals
+
 
 class ManualEntity(Entity):
     """ An entity that just moves to the closest mushroom
@@ -113,15 +138,208 @@ def relu(z):
     return np.multiply(z, z > 0)
 
 
-def activation(z):
-    """ Performs the activation function depending on the global parameter ACTIVATION
+def identity(z):
+    """ Returns the vector unchanged, for networks without an internal activation
     """
-    if ACTIVATION == "identity":
-        return z
-    if ACTIVATION == "sigmoid":
-        return sigmoid(z)
-    if ACTIVATION == "relu":
-        return relu(z)
+    return z
+
+
+# The activation functions that can be used in the internal layers, by name
+ACTIVATIONS = {"identity": identity, "sigmoid": sigmoid, "relu": relu}
+
+
+class NetworkConfig:
+    """ The configuration of the neural networks of a population
+
+    A configuration is shared by every entity of a population and is sent to
+    worker processes along with it, so it does not depend on the module defaults
+    of the process running the networks. The activation function is looked up
+    once, when the configuration is created.
+
+    An output rounds to 1 exactly when it is above 0.5, which for the sigmoid
+    function is when its input is above 0, so the final layer is never activated
+    and is compared with the threshold instead.
+
+    Attributes:
+        activation (str): The name of the activation function of the internal layers
+        linear (bool): Whether the final layer has no activation
+        hidden_units: The number of units in each hidden layer
+        dtype: The floating point type of the network parameters
+        activate: The activation function of the internal layers
+        threshold: The value the final layer must exceed to output 1
+    """
+
+    __slots__ = ["activation", "linear", "hidden_units", "dtype", "activate", "threshold"]
+
+    def __init__(  #pylint: disable=W0102,W0621
+            self, activation="identity", linear=False, hidden_units=[5], dtype=np.float64):
+        """ Instantiation of a NetworkConfig
+
+        Args:
+            activation (str): The name of the activation function, a key of ACTIVATIONS
+            linear (bool): Whether the final layer has no activation
+            hidden_units: The number of units in each hidden layer
+            dtype: The floating point type of the network parameters
+        """
+
+        self.activation = activation
+        self.linear = linear
+        self.hidden_units = list(hidden_units)
+        self.dtype = np.dtype(dtype)
+        self.activate = ACTIVATIONS[activation]
+        self.threshold = 0.5 if linear else 0
+
+    @property
+    def layers_units(self):
+        """ The number of units in each layer, including 14 inputs and 5 outputs """
+
+        return [14] + self.hidden_units + [5]
+
+    def __getstate__(self):
+        return self.activation, self.linear, self.hidden_units, self.dtype.str
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __eq__(self, other):
+        return isinstance(other, NetworkConfig) and self.__getstate__() == other.__getstate__()
+
+    def __repr__(self):
+        return "NetworkConfig(activation={!r}, linear={}, hidden_units={}, dtype={})".format(
+            self.activation, self.linear, self.hidden_units, self.dtype.name)
+
+
+def default_config(hidden_units=[5]):  #pylint: disable=W0102
+    """ Returns a NetworkConfig from the module defaults ACTIVATION, LINEAR and DTYPE
+
+    Args:
+        hidden_units: The number of units in each hidden layer
+    """
+
+    return NetworkConfig(ACTIVATION, LINEAR, hidden_units, DTYPE)
+
+
+def genome_size(layers_units):
+    """ Returns the number of parameters of a network with the given units in each layer """
+
+    return sum(units * (previous + 1) for previous, units in zip(layers_units, layers_units[1:]))
+
+
+def genome_views(genome, layers_units):
+    """ Returns views of the weights and biases of each layer of a genome
+
+    A genome holds the weights and then the biases of each layer in turn. A matrix
+    of genomes, one per row, gives views with a leading population axis, so layer l
+    has shape (N, units[l], units[l - 1]) for weights and (N, units[l], 1) for biases.
+
+    Args:
+        genome: Array of genome_size(layers_units) parameters, or a matrix of genomes
+        layers_units: The number of units in each layer
+    Returns:
+        (weights, biases): Lists of views, one per layer, with None at index 0
+    """
+
+    weights = [None]
+    biases = [None]
+    leading = genome.shape[:-1]
+    offset = 0
+    for previous, units in zip(layers_units, layers_units[1:]):
+        weights.append(genome[..., offset:offset + units * previous].reshape(
+            leading + (units, previous)))
+        offset += units * previous
+        biases.append(genome[..., offset:offset + units].reshape(leading + (units, 1)))
+        offset += units
+    return weights, biases
+
+
+def mutate(genomes, percentage_mutate):
+    """ Mutates genomes in place
+
+    Each parameter is mutated with probability percentage_mutate, by adding a
+    value taken from the rectangular distribution [-1, 1]. The mutated positions
+    are chosen with a mask over every genome at once.
+
+    Args:
+        genomes: Array of parameters, such as a genome or a matrix of genomes
+        percentage_mutate: The probability of each parameter being mutated
+    """
+
+    mask = np.random.random_sample(genomes.shape) < percentage_mutate
+    genomes[mask] += 2 * np.random.random_sample(np.count_nonzero(mask)) - 1
+
+
+def stack_parameters(entities):
+    """ Stacks the weights and biases of a population of neural entities
+
+    Every entity must have the same network shape. The genomes are stacked into
+    one matrix and layer l of the result is a view of it, with shape
+    (N, units[l], units[l - 1]) for weights and (N, units[l], 1) for biases,
+    with a None placeholder at index 0 as in NeuralEntity.
+
+    Args:
+        entities: The neural entities to stack
+    Returns:
+        (weights, biases): Lists of 3D arrays, one per layer
+    """
+
+    return genome_views(np.stack([ent.genome for ent in entities]), entities[0].layers_units)
+
+
+# The 10 input bits of each mushroom, indexed by the mushroom
+MUSHROOM_BITS = ((np.arange(1 << 10)[:, np.newaxis] >> np.arange(9, -1, -1)) & 1).astype(float)
+
+# The place value of each output bit in an output code (two action bits, then three vocal bits)
+OUTPUT_PLACES = np.array([16, 8, 4, 2, 1])
+
+
+def feed_forward(weights, biases, inputs, config=None):
+    """ Feeds inputs forwards through a network, returning the output bits
+
+    The parameters may be those of a single entity with inputs of shape (14, B),
+    or those returned by stack_parameters with inputs of shape (N, 14, B), in which
+    case one batched matrix multiplication is done per layer for all N networks.
+    Outputs are found by comparing the final layer with the threshold of the
+    configuration, which gives the outputs rounded to 0 or 1.
+
+    Args:
+        weights: The weights of each layer (index 0 is unused)
+        biases: The biases of each layer (index 0 is unused)
+        inputs: The input matrix for the network(s)
+        config: The NetworkConfig of the network(s), the default one if not given
+    Returns:
+        outputs: Integer array of 0s and 1s with the shape of the final layer
+    """
+
+    if config is None:
+        config = default_config()
+
+    activations = inputs.astype(config.dtype, copy=False)
+    for layer in range(1, len(weights) - 1):
+        activations = config.activate(np.matmul(weights[layer], activations) + biases[layer])
+
+    Z = np.matmul(weights[-1], activations) + biases[-1]
+    return (Z > config.threshold).astype(int)
+
+
+def make_inputs(locations, perceptions, listenings):
+    """ Builds the neural network inputs for a batch of observations
+
+    Column i holds the same values that behaviour would build from
+    locations[i], perceptions[i] and listenings[i].
+
+    Args:
+        locations: B angles to the nearest mushroom, from 0 to 1
+        perceptions: B 10-bit properties of the adjacent mushroom
+        listenings: B audio inputs of 3 values each
+    Returns:
+        inputs: Array of shape (14, B)
+    """
+
+    inputs = np.empty((14, len(perceptions)))
+    inputs[0] = locations
+    inputs[1:11] = MUSHROOM_BITS[np.asarray(perceptions, dtype=int)].T
+    inputs[11:14] = np.asarray(listenings).T
+    return inputs
 
 
 def bits_to_array(num, output_size):
@@ -145,45 +363,302 @@ def array_to_bits(bit_array):
     return num
 
 
+# Each output code packs an action code (upper two bits) and a vocal (lower three bits).
+# The vocals are shared, so they are tuples, and are given out as new lists.
+OUTPUTS = [(Action(code >> 3), tuple(bits_to_array(code & 0b111, 3))) for code in range(32)]
+
+
+class BehaviourTable:
+    """ A compiled lookup table of the behaviour of an entity
+
+    The entity is evaluated once, in a single batch, over every combination of
+    the observations and listenings given. Looking up the behaviour is then a
+    dictionary lookup and a list index rather than a forward pass. Inputs outside
+    the table fall back to the behaviour of the entity itself.
+
+    Attributes:
+        entity: The entity whose behaviour is compiled
+        rows: Dictionary from (location, perception) to row of the table
+        columns: Dictionary from tuple(listening) to column of the table
+        outputs: Output codes of the table, flattened row by row
+    """
+    def __init__(self, entity, observations, listenings):
+        """ Compile the behaviour of an entity
+
+        Args:
+            entity: The entity to compile (its behaviour must be deterministic)
+            observations: (location, perception) pairs that can be perceived
+            listenings: Audio inputs that can be heard
+        """
+
+        self.entity = entity
+        self.rows = {observation: i for i, observation in enumerate(observations)}
+        self.columns = {tuple(listening): i for i, listening in enumerate(listenings)}
+
+        combinations = list(itertools.product(observations, listenings))
+        inputs = make_inputs([location for (location, _), _ in combinations],
+                             [perception for (_, perception), _ in combinations],
+                             [listening for _, listening in combinations])
+        actions, vocals = entity.batch_behaviour(inputs)
+        self.outputs = (actions << 3 | vocals.dot([4, 2, 1])).tolist()
+
+    def behaviour(self, location, perception, listening):
+        """ Given perceptual inputs, looks up the action and vocal of the entity
+
+        Args:
+            location (float): Location of the nearest mushroom in angle from 0 to 1.
+            perception: 10-bit properties of the adjacent mushroom
+            listening (float[]): Audio inputs
+        Returns:
+            (Action, vocal): An Action to be taken and the vocal response
+        """
+
+        row = self.rows.get((location, perception))
+        column = self.columns.get(tuple(listening))
+        if row is None or column is None:
+            return self.entity.behaviour(location, perception, listening)
+        action, vocal = OUTPUTS[self.outputs[row * len(self.columns) + column]]
+        return action, list(vocal)
+
+
+def draw_partners(num_entities, num_draws, rng):
+    """ Draws random partners for each entity of a population, never the entity itself
+
+    Args:
+        num_entities: The size of the population
+        num_draws: The number of partners to draw for each entity
+        rng: The numpy Generator to draw with
+    Returns:
+        partners: Array of shape (num_entities, num_draws) of indices into the population
+    """
+
+    partners = rng.integers(0, num_entities - 1, (num_entities, num_draws))
+    partners += partners >= np.arange(num_entities)[:, np.newaxis]
+    return partners
+
+
+class SignalTable:
+    """ A table of the signal each entity of a population gives as a partner
+
+    In the Evolved language, a random partner names the closest mushroom given
+    only the angle to it and its properties, while hearing [0.5, 0.5, 0.5]. The
+    table holds the vocal of every partner for every angle and mushroom, so getting
+    a signal is a random choice of partner and a lookup rather than a forward pass.
+
+    Only a small fraction of the (angle, mushroom) pairs are named in a generation,
+    so the table is filled as it is used: the first time a pair is looked up, the
+    vocals of every partner for it are computed in a single batch.
+
+    Attributes:
+        config: The NetworkConfig of the partners
+        weights: The stacked weights of the partners, as in stack_parameters
+        biases: The stacked biases of the partners, as in stack_parameters
+        vocals: Array of shape (N, angles, mushrooms) of vocals as 3-bit integers,
+            UNKNOWN where not yet computed
+        angles: Sorted array of the angles in the table
+        rows: Dictionary from angle to its row of the table
+        mushrooms: Array from mushroom to its column of the table
+        exclude: The entity that is never chosen as a partner, or None
+        partners: Pre-drawn partners used in turn, or None to draw them randomly
+        draws: The number of pre-drawn partners used so far
+    """
+
+    UNKNOWN = 8
+
+    def __init__(self, entities, angles, mushrooms, exclude=None):
+        """ Create an empty table of signals for a population
+
+        Args:
+            entities: The neural entities, all with the same network configuration
+            angles: The sorted angles to the mushroom that can be named
+            mushrooms: The mushrooms that can be named
+            exclude: The entity that is never chosen as a partner
+        """
+
+        self.config = entities[0].config
+        self.weights, self.biases = stack_parameters(entities)
+        self.vocals = np.full((len(entities), len(angles), len(mushrooms)), self.UNKNOWN,
+                              dtype=np.uint8)
+        self.angles = np.asarray(angles)
+        self.rows = {angle: i for i, angle in enumerate(angles)}
+        self.mushrooms = np.zeros(1 << 10, dtype=int)
+        self.mushrooms[mushrooms] = np.arange(len(mushrooms))
+        self.exclude = exclude
+        self.partners = None
+        self.draws = 0
+
+    def excluding(self, index, partners=None):
+        """ Returns the same table with the entity at index excluded from being a partner
+
+        Args:
+            index: The entity that is never chosen as a partner
+            partners: Partners to use in turn, as drawn by draw_partners for the entity
+        """
+
+        table = copy.copy(self)
+        table.exclude = index
+        table.partners = partners
+        table.draws = 0
+        return table
+
+    def __len__(self):
+        """ Returns the number of partners that can be chosen """
+
+        return len(self.vocals) - (self.exclude is not None)
+
+    def fill(self, rows, mushrooms):
+        """ Computes the vocals of every partner for (angle, mushroom) pairs in one batch
+
+        Args:
+            rows: The rows of the angles in the table
+            mushrooms: The mushrooms
+        """
+
+        inputs = make_inputs(self.angles[rows], mushrooms, np.full((len(mushrooms), 3), 0.5))
+        outputs = feed_forward(self.weights, self.biases, inputs, self.config)
+        self.vocals[:, rows, self.mushrooms[mushrooms]] = (4 * outputs[:, 2] +
+                                                           2 * outputs[:, 3] + outputs[:, 4])
+
+    def signal(self, angle, mushroom):
+        """ Returns the signal given for a mushroom by a random partner
+
+        Args:
+            angle (float): The angle to the mushroom, which must be in the table
+            mushroom: The 10-bit mushroom, which must be in the table
+        Returns:
+            signal (int[]): The 3-bit vocal of the partner
+        """
+
+        if self.partners is not None:
+            partner = self.partners[self.draws]
+            self.draws += 1
+        else:
+            partner = random.randrange(len(self))
+            if self.exclude is not None and partner >= self.exclude:
+                partner += 1
+        row = self.rows[angle]
+        column = self.mushrooms[mushroom]
+        if self.vocals[partner, row, column] == self.UNKNOWN:
+            self.fill([row], [mushroom])
+        return list(OUTPUTS[self.vocals[partner, row, column]][1])
+
+    def signals(self, partners, angles, mushrooms):
+        """ Returns the signals given by many partners at once
+
+        Args:
+            partners: Array of the partners naming each mushroom
+            angles: Array of angles to each mushroom, which must be in the table
+            mushrooms: Array of the mushrooms, which must be in the table
+        Returns:
+            signals: Array of shape (len(partners), 3) of the vocals of the partners
+        """
+
+        rows = np.searchsorted(self.angles, angles)
+        columns = self.mushrooms[mushrooms]
+        unknown = self.vocals[partners, rows, columns] == self.UNKNOWN
+        if unknown.any():
+            pairs = np.unique(np.stack([rows[unknown], mushrooms[unknown]]), axis=1)
+            self.fill(pairs[0], pairs[1])
+        vocals = self.vocals[partners, rows, columns]
+        return (vocals[:, np.newaxis] >> np.arange(2, -1, -1)) & 1
+
+
 class NeuralEntity(Entity):
     """ An entity controlled by a Feed Forward Neural Network
+
+    The parameters are held in one contiguous genome, and the weights and biases
+    of each layer are views of it, so they should be changed in place.
+
+    Attributes:
+        layers_units: The number of units in each layer
+        genome: Array of every parameter, as laid out by genome_views
+        weights: Views of the weights of each layer, with None at index 0
+        biases: Views of the biases of each layer, with None at index 0
+        config: The NetworkConfig of the network, shared with the rest of the population
+        inputs: Buffer of the inputs of a single observation, of shape (14, 1)
+        activations: Buffers of the activations of each layer, with None at index 0
     """
 
-    weights = []
-    biases = []
+    __slots__ = ["layers_units", "genome", "weights", "biases", "config", "inputs", "activations"]
+
+    def __init__(  #pylint: disable=W0102
+            self, fitness=0, hidden_units=[5], genome=None, config=None):
+        """ Instantiation of a NeuralEntity
+
+        Args:
+            fitness: The initial fitness of this entity
+            hidden_units: The number of units in each hidden layer, if no config is given
+            genome: The parameters of the network (random if not given)
+            config: The NetworkConfig of the network (from the module defaults if not given)
+        """
 
-    def __init__(self, fitness=0, hidden_units=[5]):  #pylint: disable=W0102
         super().__init__(fitness)
-        # Add 14 input units and 5 output units
-        self.weights = [None]
-        self.biases = [None]
-        self.initialise_parameters([14] + hidden_units + [5])
+        if config is None:
+            config = default_config(hidden_units)
+        if genome is None:
+            self.initialise_parameters(config)
+        else:
+            self.set_genome(genome, config)
+
+    def set_genome(self, genome, config):
+        """ Sets the parameters of the network to a genome
+
+        Args:
+            genome: Array of genome_size(config.layers_units) parameters of type config.dtype
+            config: The NetworkConfig of the network
+        """
 
-    def initialise_parameters(self, layers_units, zero=False):
+        self.config = config
+        self.layers_units = config.layers_units
+        self.genome = genome
+        self.weights, self.biases = genome_views(genome, self.layers_units)
+        self.inputs = np.empty((self.layers_units[0], 1), dtype=config.dtype)
+        self.activations = [None] + [
+            np.empty((units, 1), dtype=config.dtype) for units in self.layers_units[1:]
+        ]
+
+    def initialise_parameters(self, config, zero=False):
         """ Initialises weights and biases of the neural network.
 
         Weights are initially set to random values
 
         Args:
-            layer_units: The number of units in each layer
+            config: The NetworkConfig of the network
             zero: Sets weights and biases to 0
         """
 
+        layers_units = config.layers_units
+        self.set_genome(np.empty(genome_size(layers_units), dtype=config.dtype), config)
         for layer in range(1, len(layers_units)):
             # Choose random weights and biases from rectangular distribution [-1, 1]
-            layer_weights = (2 * np.random.random_sample(
+            self.weights[layer][...] = (2 * np.random.random_sample(
                 (layers_units[layer], layers_units[layer - 1])) - 1)
-            self.weights.append(layer_weights)
-
-            layer_biases = (2 * np.random.random_sample((layers_units[layer], 1)) - 1)
-            self.biases.append(layer_biases)
+            self.biases[layer][...] = (2 * np.random.random_sample((layers_units[layer], 1)) - 1)
 
         # Initialise the parameters to zero
         if zero:
-            for layer in range(1, len(layers_units)):
-                # Set all weights and biases to 0
-                self.weights[layer] = np.zeros((layers_units[layer], layers_units[layer - 1]))
-                self.biases[layer] = np.zeros((layers_units[layer], 1))
+            self.genome[:] = 0
+
+    def __getstate__(self):
+        return self.fitness, self.config, self.genome
+
+    def __setstate__(self, state):
+        """ Restores an entity, including one pickled before genomes or configurations
+        were introduced, which is given a configuration from the module defaults
+        """
+
+        if isinstance(state, dict):
+            layers_units = [state["weights"][1].shape[1]]
+            layers_units += [weights.shape[0] for weights in state["weights"][1:]]
+            genome = np.concatenate([
+                parameters.ravel() for layer in range(1, len(layers_units))
+                for parameters in (state["weights"][layer], state["biases"][layer])
+            ])
+            state = (state.get("fitness", 0), layers_units, genome)
+        self.fitness, config, genome = state
+        if not isinstance(config, NetworkConfig):
+            config = NetworkConfig(ACTIVATION, LINEAR, config[1:-1], genome.dtype)
+        self.set_genome(genome, config)
 
     def forward_propagation(self, inputs):
         """ Given an input matrix, feeds it forwards through the neural network.
@@ -197,25 +672,23 @@ class NeuralEntity(Entity):
             outputs: The activations of the final layer within the network
         """
 
-        num_layers = len(self.weights)
-        activations = [None for _ in range(num_layers)]
-        activations[0] = inputs
+        # Feed forwards and return the final layer, rounded to 0 or 1
+        return feed_forward(self.weights, self.biases, inputs, self.config)[:, 0].tolist()
 
-        # For each layer, calculate the weighted sum (Z) and the activations
-        for layer in range(1, num_layers - 1):
-            Z = np.dot(self.weights[layer], activations[layer - 1]) + self.biases[layer]
-            # Perform activation function
-            activations[layer] = activation(Z)
+    def batch_behaviour(self, inputs):
+        """ Given a matrix of perceptual inputs, returns an action and vocal for each column.
 
-        # Calculate the final layer using the sigmoid function (or not)
-        Z = np.dot(self.weights[-1], activations[-2]) + self.biases[-1]
-        activations[-1] = Z if LINEAR else sigmoid(Z)
+        All of the columns are fed through the network at once.
 
-        # Return final layer, rounded to 0 or 1
-        outputs = list(map(int, map(round, list(np.squeeze(activations[-1])))))
-        outputs = [1 if x >= 1 else 0 for x in outputs]
+        Args:
+            inputs: Array of shape (14, B) as built by make_inputs
+        Returns:
+            (actions, vocals): Array of B action codes and (B, 3) array of vocal bits
+        """
 
-        return outputs
+        outputs = feed_forward(self.weights, self.biases, inputs, self.config)
+        actions = 2 * outputs[0] + outputs[1]
+        return actions, outputs[2:5].T
 
     def reproduce(self, num_offspring, percentage_mutate):
         """ Produce children through asexual reproduction with random mutation
@@ -230,36 +703,10 @@ class NeuralEntity(Entity):
             children: An array of children produced
         """
 
-        children = []
-
-        for _ in range(num_offspring):
-            # Do a deep copy of self
-            child = NeuralEntity(0)
-            child.weights = copy.deepcopy(self.weights)
-            child.biases = copy.deepcopy(self.biases)
-            num_layers = len(self.weights)
-
-            # Randomly alter a percentage of the weights by adding a value in [-1, 1]
-            for layer in range(1, num_layers):
-                weights = child.weights[layer]
-                weights = np.array([[
-                    x + random.random() * 2 - 1 if random.random() < percentage_mutate else x
-                    for x in xs
-                ] for xs in weights])
-                child.weights[layer] = weights
-
-            for layer in range(1, num_layers):
-                biases = child.biases[layer]
-                biases = np.array([[
-                    x + random.random() * 2 - 1 if random.random() < percentage_mutate else x
-                    for x in xs
-                ] for xs in biases])
-                child.biases[layer] = biases
-
-            # Add child to output
-            children.append(child)
-
-        return children
+        # Copy the genome of self once per child and mutate them all at once
+        genomes = np.repeat(self.genome[np.newaxis], num_offspring, axis=0)
+        mutate(genomes, percentage_mutate)
+        return [NeuralEntity(0, genome=genome, config=self.config) for genome in genomes]
 
     def behaviour(self, location, perception, listening):
         """ Given perceptual inputs, just moves towards and eats the nearest mushroom.
@@ -272,44 +719,41 @@ class NeuralEntity(Entity):
             (Action, vocal): An Action to be taken and the vocal response
         """
 
-        # Create neural network inputs
-        inputs = []
-        inputs.append(location)
-        inputs.extend(bits_to_array(perception, 10))
-        inputs.extend(listening)
-        inputs = np.array([[inp] for inp in inputs])
+        # Fill the input buffer, looking up the bits of the mushroom
+        inputs = self.inputs
+        inputs[0, 0] = location
+        inputs[1:11, 0] = MUSHROOM_BITS[perception]
+        inputs[11:14, 0] = listening
 
-        # Feed forward through the neural network
-        outputs = self.forward_propagation(inputs)
+        # Feed forward through the neural network into the buffers of each layer
+        activations = inputs
+        for layer in range(1, len(self.weights)):
+            out = self.activations[layer]
+            np.matmul(self.weights[layer], activations, out=out)
+            out += self.biases[layer]
+            activations = self.config.activate(out) if layer < len(self.weights) - 1 else out
 
-        # Debug info
-        # print("Inputs to neural net: ", inputs)
-        # print("Outputs from neural net: ", outputs)
+        # The outputs are the final layer above the threshold, read as an output code
+        # of the action (upper two bits) and the vocal (lower three bits)
+        action, vocal = OUTPUTS[OUTPUT_PLACES.dot(activations[:, 0] > self.config.threshold)]
+        return action, list(vocal)
 
-        # Get action from outputs
-        if (outputs[0] == 1 and outputs[1] == 1):
-            action = Action.FORWARDS
-        elif (outputs[0] == 1 and outputs[1] == 0):
-            action = Action.LEFT
-        elif (outputs[0] == 0 and outputs[1] == 1):
-            action = Action.RIGHT
-        else:
-            action = Action.NOTHING
+    def compile(self, observations, listenings):
+        """ Returns a BehaviourTable of this entity over every combination of inputs given
 
-        # Get vocal from outputs
-        vocal = outputs[2:5]
+        Args:
+            observations: (location, perception) pairs that can be perceived
+            listenings: Audio inputs that can be heard
+        """
 
-        return action, vocal
+        return BehaviourTable(self, observations, listenings)
 
     def copy(self):
         """
         Returns a copy of this entity with default fitness
         """
 
-        ent = NeuralEntity()
-        ent.weights = copy.deepcopy(self.weights)
-        ent.biases = copy.deepcopy(self.biases)
-        return ent
+        return NeuralEntity(0, genome=self.genome.copy(), config=self.config)
 
     def equal_network(self, ent):
         """
@@ -5,16 +5,25 @@ simulated world for the entities to move within.
 Contains the Direction enum for dealing with orientation. 
 """
 
+from collections.abc import MutableMapping
 from enum import Enum
 import math
 import random
 
+import numpy as np
+
 from simulating.action import Action
 
 # Used for indexing positions
 X = 0
 Y = 1
 
+# Cache of the angles returned by reachable_angles, by world size and maximum offset
+REACHABLE_ANGLES = {}
+
+# Cache of the tables returned by angle_table, by world size
+ANGLE_TABLES = {}
+
 
 class Direction(Enum):
     """ Abstracts the concept of Direction within the world """
@@ -55,9 +64,18 @@ class Direction(Enum):
         return "◁"
 
 
-def get_random_direction():
-    """ Returns a random Direction """
-    return random.choice(list(Direction))
+# Integer codes for each Direction, with lookup tables for turning and moving forwards
+DIRECTIONS = list(Direction)
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+TURN_RIGHT = [DIRECTION_CODES[direction.right()] for direction in DIRECTIONS]
+TURN_LEFT = [DIRECTION_CODES[direction.left()] for direction in DIRECTIONS]
+FORWARD_X = [direction.value[X] for direction in DIRECTIONS]
+FORWARD_Y = [direction.value[Y] for direction in DIRECTIONS]
+
+
+def get_random_direction(rng=random):
+    """ Returns a random Direction, drawn from rng (the random module by default) """
+    return rng.choice(list(Direction))
 
 
 class MushroomNotFound(RuntimeError):
@@ -68,6 +86,251 @@ class WorldFull(RuntimeError):
     """ Exception thrown when there isn't space left in the world to place something """
 
 
+class ScanIndex:
+    """ Finds the closest mushroom by scanning every mushroom in the world
+
+    Mushrooms at the same distance are ordered by when they were placed,
+    which is the iteration order of the world dictionary.
+    """
+    def __init__(self, env):
+        self.env = env
+
+    def reset(self):
+        """ Called when the world is emptied """
+
+    def add(self, pos):
+        """ Called when a mushroom is placed at a position """
+
+    def remove(self, pos):
+        """ Called when the mushroom at a position is removed """
+
+    def closest(self, pos):
+        """ Returns the position of the closest mushroom to a position.
+
+        Raises:
+            MushroomNotFound: No mushrooms found.
+        """
+
+        if len(self.env.world) == 0:
+            raise MushroomNotFound("No Mushrooms in World")
+        dist = self.env.dim_x + self.env.dim_y + 1
+        mush_pos = (-1, -1)
+        for (i, j) in self.env.world:
+            # Use manhattan distance
+            dist_to_mushroom = abs(pos[X] - i) + abs(pos[Y] - j)
+            if dist_to_mushroom < dist:
+                dist = dist_to_mushroom
+                mush_pos = (i, j)
+
+        return mush_pos
+
+
+class GridIndex:
+    """ Finds the closest mushroom by searching grid buckets in expanding rings
+
+    The world is divided into square buckets of cells. A search starts at the
+    bucket of the position and moves outwards one ring of buckets at a time
+    until no unsearched bucket can hold a closer mushroom, so the cost depends
+    on the local density of mushrooms rather than their total number.
+    Mushrooms at the same distance are ordered by when they were placed,
+    as in ScanIndex.
+
+    Attributes:
+        bucket_size: The width and height of each bucket in cells
+        buckets: 2D list of dictionaries from position to placement number
+    """
+    def __init__(self, env, bucket_size=None):
+        """ Instantiate a grid index for an environment
+
+        Args:
+            env: The environment being indexed
+            bucket_size (int): Width of the buckets, by default chosen so
+                that each bucket holds about one mushroom
+        """
+
+        self.env = env
+        if bucket_size is None:
+            mushrooms = max(env.num_edible + env.num_poisonous, 1)
+            bucket_size = max(1, int(math.sqrt(env.dim_x * env.dim_y / mushrooms)))
+        self.bucket_size = bucket_size
+        self.num_x = -(-env.dim_x // bucket_size)
+        self.num_y = -(-env.dim_y // bucket_size)
+        self.buckets = []
+        self.count = 0
+        self.placed = 0
+        self.reset()
+
+    def reset(self):
+        """ Called when the world is emptied """
+
+        self.buckets = [[{} for _ in range(self.num_y)] for _ in range(self.num_x)]
+        self.count = 0
+        self.placed = 0
+
+    def add(self, pos):
+        """ Called when a mushroom is placed at a position """
+
+        self.buckets[pos[X] // self.bucket_size][pos[Y] // self.bucket_size][pos] = self.placed
+        self.placed += 1
+        self.count += 1
+
+    def remove(self, pos):
+        """ Called when the mushroom at a position is removed """
+
+        bucket = self.buckets[pos[X] // self.bucket_size][pos[Y] // self.bucket_size]
+        if bucket.pop(pos, None) is not None:
+            self.count -= 1
+
+    def closest(self, pos):
+        """ Returns the position of the closest mushroom to a position.
+
+        Raises:
+            MushroomNotFound: No mushrooms found.
+        """
+
+        if self.count == 0:
+            raise MushroomNotFound("No Mushrooms in World")
+
+        x, y = pos
+        bucket_x = x // self.bucket_size
+        bucket_y = y // self.bucket_size
+        max_ring = max(bucket_x, self.num_x - 1 - bucket_x, bucket_y, self.num_y - 1 - bucket_y)
+        best = None
+        for ring in range(max_ring + 1):
+            # Cells in this ring are at least this far away along one axis
+            if best is not None and (ring - 1) * self.bucket_size + 1 > best[0]:
+                break
+            for i, j in self.ring(bucket_x, bucket_y, ring):
+                for (mush_x, mush_y), placed in self.buckets[i][j].items():
+                    key = (abs(x - mush_x) + abs(y - mush_y), placed, (mush_x, mush_y))
+                    if best is None or key < best:
+                        best = key
+        return best[2]
+
+    def ring(self, bucket_x, bucket_y, ring):
+        """ Returns the buckets within the grid at a Chebyshev distance ring from a bucket """
+
+        if ring == 0:
+            return [(bucket_x, bucket_y)]
+        buckets = []
+        for i in range(max(bucket_x - ring, 0), min(bucket_x + ring, self.num_x - 1) + 1):
+            for j in (bucket_y - ring, bucket_y + ring):
+                if 0 <= j < self.num_y:
+                    buckets.append((i, j))
+        for j in range(max(bucket_y - ring + 1, 0), min(bucket_y + ring - 1, self.num_y - 1) + 1):
+            for i in (bucket_x - ring, bucket_x + ring):
+                if 0 <= i < self.num_x:
+                    buckets.append((i, j))
+        return buckets
+
+
+class MapIndex:
+    """ Keeps a map of the closest mushroom to every cell in the world
+
+    Each cell holds a key packing the Manhattan distance to its closest mushroom
+    (the upper bits) and the placement number of that mushroom (the lower 32 bits),
+    so the smallest key is the closest mushroom with ties broken in placement order.
+    The map is built once after the world is reset and then patched as mushrooms
+    are eaten, making closest a single lookup.
+
+    Attributes:
+        keys: Array of shape (dim_x, dim_y) of the key of each cell
+        positions: Dictionary from placement number to the position of each mushroom
+        numbers: Dictionary from position to placement number of each mushroom
+        built: Whether the map is up to date with the mushrooms placed
+    """
+
+    # Packing of distances and placement numbers into keys
+    DISTANCE = 1 << 32
+    NUMBER = DISTANCE - 1
+    EMPTY = 1 << 62
+
+    def __init__(self, env):
+        self.env = env
+        self.xs, self.ys = np.indices((env.dim_x, env.dim_y))
+        self.keys = np.full((env.dim_x, env.dim_y), self.EMPTY, dtype=np.int64)
+        self.positions = {}
+        self.numbers = {}
+        self.placed = 0
+        self.built = False
+
+    def reset(self):
+        """ Called when the world is emptied """
+
+        self.positions = {}
+        self.numbers = {}
+        self.placed = 0
+        self.built = False
+
+    def add(self, pos):
+        """ Called when a mushroom is placed at a position """
+
+        self.positions[self.placed] = pos
+        self.numbers[pos] = self.placed
+        if self.built:
+            distances = np.abs(self.xs - pos[X]) + np.abs(self.ys - pos[Y])
+            np.minimum(self.keys, distances * self.DISTANCE + self.placed, out=self.keys)
+        self.placed += 1
+
+    def remove(self, pos):
+        """ Called when the mushroom at a position is removed """
+
+        number = self.numbers.pop(pos, None)
+        if number is None:
+            return
+        del self.positions[number]
+        if not self.built:
+            return
+
+        # Find the new closest mushroom for the cells that were closest to this one
+        cells = np.nonzero((self.keys & self.NUMBER) == number)
+        if not self.positions:
+            self.keys[cells] = self.EMPTY
+            return
+        numbers = np.array(list(self.positions))
+        mushrooms = np.array(list(self.positions.values()))
+        distances = (np.abs(cells[X][:, np.newaxis] - mushrooms[:, X]) +
+                     np.abs(cells[Y][:, np.newaxis] - mushrooms[:, Y]))
+        self.keys[cells] = (distances * self.DISTANCE + numbers).min(axis=1)
+
+    def build(self):
+        """ Computes the closest mushroom to every cell
+
+        Uses a separable Manhattan distance transform: the closest key along each
+        column is found first, then the closest of those along each row.
+        """
+
+        keys = np.full((self.env.dim_x, self.env.dim_y), self.EMPTY, dtype=np.int64)
+        for number, pos in self.positions.items():
+            keys[pos] = number
+        for axis, offsets in [(Y, self.ys), (X, self.xs)]:
+            offsets = offsets * self.DISTANCE
+            forwards = np.minimum.accumulate(keys - offsets, axis=axis) + offsets
+            backwards = np.flip(
+                np.minimum.accumulate(np.flip(keys + offsets, axis=axis), axis=axis),
+                axis=axis) - offsets
+            keys = np.minimum(forwards, backwards)
+        self.keys = keys
+        self.built = True
+
+    def closest(self, pos):
+        """ Returns the position of the closest mushroom to a position.
+
+        Raises:
+            MushroomNotFound: No mushrooms found.
+        """
+
+        if not self.built:
+            self.build()
+        if not self.positions:
+            raise MushroomNotFound("No Mushrooms in World")
+        return self.positions[self.keys.item(pos) & self.NUMBER]
+
+
+# Spatial indexes that can be used to find the closest mushroom
+SPATIAL_INDEXES = {"scan": ScanIndex, "grid": GridIndex, "map": MapIndex}
+
+
 class Environment:
     """ Representation of the simulated world
 
@@ -84,6 +347,8 @@ class Environment:
         num_edible: The number of edible mushrooms in the world
         entity_position: Position of the entity
         entity_direction: Direction the entity is currently facing
+        index: The spatial index used to find the closest mushroom
+        rng: The random.Random (or the random module) the world is generated from
     """
 
     world = {}
@@ -95,9 +360,21 @@ class Environment:
     entity_position = (0, 0)
     entity_direction = Direction.NORTH
 
+    angles = {}
+    rng = random
+
     # ----- World Creation ----- #
 
-    def __init__(self, width=20, height=20, poisonous=10, edible=10, debug=False):
+    def __init__(  #pylint: disable=R0913
+            self,
+            width=20,
+            height=20,
+            poisonous=10,
+            edible=10,
+            debug=False,
+            spatial_index="scan",
+            rng=None,
+            generate=True):
         """ Instantiate a new Environment object
 
         Args:
@@ -105,18 +382,25 @@ class Environment:
             height (int): The height of the world
             poisonous (int): The number of poisonous mushrooms to place in the world
             edible (int): The number of edible mushrooms to place in the world
+            spatial_index (str): The SPATIAL_INDEXES entry used to find the closest mushroom
+            rng: A random.Random to generate the worlds from, the random module if not given
+            generate (bool): If false, the world is left empty to be loaded with load_world
         Returns:
             env: A new Environment object
         Raises:
             WorldFull: World is full
         """
 
+        self.rng = random if rng is None else rng
         self.dim_x = width
         self.dim_y = height
         self.num_poisonous = poisonous
         self.num_edible = edible
         self.debug = debug
-        self.reset()
+        self.angles = angle_table(width, height)
+        self.index = SPATIAL_INDEXES[spatial_index](self)
+        if generate:
+            self.reset()
 
     def reset(self):
         """ Reset the world
@@ -126,13 +410,14 @@ class Environment:
         """
 
         self.world = {}
+        self.index.reset()
         if self.debug:
             self.generate_fixed_world()
         else:
             for _ in range(self.num_edible):
-                self.place_mushroom(make_edible())
+                self.place_mushroom(make_edible(self.rng.randint(0, 9)))
             for _ in range(self.num_poisonous):
-                self.place_mushroom(make_poisonous())
+                self.place_mushroom(make_poisonous(self.rng.randint(0, 9)))
 
     def generate_fixed_world(self):
         """ Generates a fixed world deterministically
@@ -145,7 +430,7 @@ class Environment:
         #     self.world[(x + 5, y + 15)] = make_edible(i + 5)
         #     self.world[(x + 15, y + 15)] = make_poisonous(i + 5)
 
-        self.world[(10, 5)] = make_poisonous(1)
+        self.add_mushroom((10, 5), make_poisonous(1))
 
     # ----- Mushroom manipulation methods ----- #
 
@@ -158,12 +443,24 @@ class Environment:
             WorldFull: No space for the mushroom.
         """
 
-        pos = self.random_available_position()
+        self.add_mushroom(self.random_available_position(), mushroom)
+
+    def add_mushroom(self, pos, mushroom):
+        """ Places a mushroom at a given empty position
+
+        Args:
+            pos (int, int): The position to place the mushroom at.
+            mushroom (int): Bit pattern for the mushroom to be placed.
+        """
+
         self.world[pos] = mushroom
+        self.index.add(pos)
 
     def closest_mushroom(self, pos):
         """ Returns the position to the closest mushroom in the world.
-        
+
+        Ties are broken in favour of the mushroom placed first.
+
         Args:
             pos (int, int): Position searching from.
         Raises:
@@ -171,18 +468,7 @@ class Environment:
 
         """
 
-        if len(self.world) == 0:
-            raise MushroomNotFound("No Mushrooms in World")
-        dist = self.dim_x + self.dim_y + 1
-        mush_pos = (-1, -1)
-        for (i, j) in self.world:
-            # Use manhattan distance
-            dist_to_mushroom = abs(pos[X] - i) + abs(pos[Y] - j)
-            if dist_to_mushroom < dist:
-                dist = dist_to_mushroom
-                mush_pos = (i, j)
-
-        return mush_pos
+        return self.index.closest(pos)
 
     def is_mushroom(self, pos):
         """ Returns whether or not there is a mushroom in a given position """
@@ -200,10 +486,26 @@ class Environment:
             self.entity_direction = Direction.NORTH
             self.entity_position = (10, 10)
         else:
-            self.entity_direction = get_random_direction()
+            self.entity_direction = get_random_direction(self.rng)
             pos = self.random_available_position()
             self.entity_position = pos
 
+    def load_world(self, bank, index):
+        """ Replaces the world and the entity with a world of a WorldBank
+
+        Args:
+            bank (WorldBank): The bank of worlds
+            index (int): The world of the bank to load
+        """
+
+        self.world = {}
+        self.index.reset()
+        for pos, mushroom in zip(map(tuple, bank.positions[index].tolist()),
+                                 bank.mushrooms[index].tolist()):
+            self.add_mushroom(pos, mushroom)
+        self.entity_position = tuple(bank.starts[index].tolist())
+        self.entity_direction = DIRECTIONS[bank.directions[index]]
+
     def move_entity(self, action):
         """ Moves the entity in the world according to the Action taken.
 
@@ -242,20 +544,23 @@ class Environment:
         """ Returns the angle from the entity to a position, from 0 to 1.
 
         The angle is measured clockwise where 0 is directly forwards.
+        It is looked up in the angle table of the world.
 
         Args:
-            pos_to: The goal posision
+            pos_to: The goal posision, within the world
         Returns:
             angle (float): The angle from 0 to 1.
         """
 
-        return self.get_angle(self.entity_position, pos_to, self.entity_direction)
+        x1, y1 = self.entity_position
+        x2, y2 = pos_to
+        return self.angles[self.entity_direction][x2 - x1][y2 - y1]
 
     # ----- Utility methods ----- #
 
     def random_position(self):
         """ Return a random position within the world dimensions """
-        return (random.randint(0, self.dim_x - 1), random.randint(0, self.dim_y - 1))
+        return (self.rng.randint(0, self.dim_x - 1), self.rng.randint(0, self.dim_y - 1))
 
     def random_available_position(self):
         """ Return a random available position within the world dimensions
@@ -269,7 +574,7 @@ class Environment:
         cell_occupied = True
         pos = (-1, -1)
         while cell_occupied:
-            new_pos = random.randint(0, self.dim_x - 1), random.randint(0, self.dim_y - 1)
+            new_pos = self.rng.randint(0, self.dim_x - 1), self.rng.randint(0, self.dim_y - 1)
             if new_pos not in self.world:
                 pos = new_pos
                 cell_occupied = False
@@ -298,18 +603,19 @@ class Environment:
             angle (float): The angle from 0 to 1.
         """
 
-        x1, y1 = pos_from
-        x2, y2 = pos_to
-        if x1 == x2 and y1 == y2:
-            return 0
-        angle = -math.degrees(math.atan2(y1 - y2, x2 - x1))
-        if direction == Direction.NORTH:
-            angle += 90
-        if direction == Direction.WEST:
-            angle += 180
-        if direction == Direction.SOUTH:
-            angle -= 90
-        return (angle % 360) / 360
+        return angle_between(pos_from, pos_to, direction)
+
+    def reachable_angles(self, max_offset=None):
+        """ Returns every angle an entity can perceive to a position in this world, sorted.
+
+        Args:
+            max_offset (int): Only consider positions at most this many cells away
+                along each axis (defaults to the whole world)
+        Returns:
+            angles (float[]): The distinct angles from 0 to 1
+        """
+
+        return reachable_angles(self.dim_x, self.dim_y, max_offset)
 
     def get_cell(self, pos):
         """ Returns the value of the cell at position pos, 0 if empty"""
@@ -319,7 +625,8 @@ class Environment:
     def clear_cell(self, pos):
         """ Clears the cell at a specified position """
 
-        self.world.pop(pos, None)
+        if self.world.pop(pos, None) is not None:
+            self.index.remove(pos)
 
     # ----- String conversion ----- #
 
@@ -338,6 +645,585 @@ class Environment:
         return '\n'.join(out)
 
 
+class GridWorld(MutableMapping):
+    """ A dictionary view of the mushrooms in a GridEnvironment
+
+    Positions are iterated in the order their mushrooms were placed,
+    as in the world dictionary of Environment.
+    """
+    def __init__(self, env):
+        self.env = env
+
+    def __getitem__(self, pos):
+        if not self.env.within_bounds(pos) or self.env.grid[pos] == 0:
+            raise KeyError(pos)
+        return int(self.env.grid[pos])
+
+    def __setitem__(self, pos, mushroom):
+        if self.env.is_mushroom(pos):
+            self.env.grid[pos] = mushroom
+        else:
+            self.env.add_mushroom(pos, mushroom)
+
+    def __delitem__(self, pos):
+        if pos not in self:
+            raise KeyError(pos)
+        self.env.clear_cell(pos)
+
+    def __contains__(self, pos):
+        return self.env.within_bounds(pos) and self.env.is_mushroom(pos)
+
+    def __iter__(self):
+        xs, ys = np.nonzero(self.env.grid)
+        order = np.argsort(self.env.order[xs, ys])
+        return iter(list(zip(xs[order].tolist(), ys[order].tolist())))
+
+    def __len__(self):
+        return self.env.num_mushrooms
+
+
+class GridEnvironment(Environment):
+    """ Representation of the simulated world backed by arrays
+
+    Has the same methods as Environment, but stores the world as an int16 grid
+    of mushrooms and the direction of the entity as an integer code, using
+    lookup tables to turn and move forwards. Worlds are generated in reset()
+    by sampling all of the mushroom positions at once without replacement.
+
+    Attributes:
+        grid: Array of shape (dim_x, dim_y) holding the mushroom in each cell, 0 if empty
+        order: Array of shape (dim_x, dim_y) holding the placement number of each mushroom
+        num_mushrooms: The number of mushrooms currently in the world
+        direction_code: Index of the direction of the entity in DIRECTIONS
+    """
+
+    grid = None
+    order = None
+    num_mushrooms = 0
+    placed = 0
+    direction_code = 0
+
+    def __init__(  #pylint: disable=R0913
+            self,
+            width=20,
+            height=20,
+            poisonous=10,
+            edible=10,
+            debug=False,
+            spatial_index="map",
+            generate=True):
+        """ Instantiate a new GridEnvironment object
+
+        Args:
+            width (int): The width of the world
+            height (int): The height of the world
+            poisonous (int): The number of poisonous mushrooms to place in the world
+            edible (int): The number of edible mushrooms to place in the world
+            spatial_index (str): The SPATIAL_INDEXES entry used to find the closest mushroom
+            generate (bool): If false, the world is left empty to be loaded with load_world
+        Raises:
+            WorldFull: World is full
+        """
+
+        self.grid = np.zeros((width, height), dtype=np.int16)
+        self.order = np.zeros((width, height), dtype=np.int64)
+        self.code_angles = []
+        super().__init__(width, height, poisonous, edible, debug, spatial_index,
+                         generate=generate)
+        self.code_angles = [self.angles[direction] for direction in DIRECTIONS]
+
+    @property
+    def world(self):
+        """ A dictionary view of the mushrooms in the world """
+        return GridWorld(self)
+
+    @property
+    def entity_direction(self):
+        """ The Direction the entity is facing """
+        return DIRECTIONS[self.direction_code]
+
+    @entity_direction.setter
+    def entity_direction(self, direction):
+        self.direction_code = DIRECTION_CODES[direction]
+
+    def reset(self):
+        """ Reset the world
+
+        Removes all remaining mushrooms and places the number of mushrooms needed randomly again,
+        choosing every position at once. Doesn't reset the position of the entity.
+
+        Raises:
+            WorldFull: World is full
+        """
+
+        self.grid.fill(0)
+        self.num_mushrooms = 0
+        self.placed = 0
+        self.index.reset()
+        if self.debug:
+            self.generate_fixed_world()
+            return
+
+        num_mushrooms = self.num_edible + self.num_poisonous
+        if num_mushrooms > self.dim_x * self.dim_y:
+            raise WorldFull("No available spaces remaining in world")
+        cells = np.random.choice(self.dim_x * self.dim_y, num_mushrooms, replace=False)
+        flipped = 1 << np.random.randint(0, 10, num_mushrooms)
+        mushrooms = np.where(np.arange(num_mushrooms) < self.num_edible, 0b1111100000,
+                             0b0000011111) ^ flipped
+        xs, ys = np.unravel_index(cells, (self.dim_x, self.dim_y))
+        self.grid[xs, ys] = mushrooms
+        self.order[xs, ys] = np.arange(num_mushrooms)
+        self.num_mushrooms = num_mushrooms
+        self.placed = num_mushrooms
+        for pos in zip(xs.tolist(), ys.tolist()):
+            self.index.add(pos)
+
+    def add_mushroom(self, pos, mushroom):
+        """ Places a mushroom at a given empty position
+
+        Args:
+            pos (int, int): The position to place the mushroom at.
+            mushroom (int): Bit pattern for the mushroom to be placed.
+        """
+
+        self.grid[pos] = mushroom
+        self.order[pos] = self.placed
+        self.placed += 1
+        self.num_mushrooms += 1
+        self.index.add(pos)
+
+    def is_mushroom(self, pos):
+        """ Returns whether or not there is a mushroom in a given position """
+        return self.grid.item(pos) != 0
+
+    def place_entity(self):
+        """ Places an entity in a random available position in the world.
+
+        Raises:
+            WorldFull: No space for the entity.
+        """
+        if self.debug:
+            self.direction_code = DIRECTION_CODES[Direction.NORTH]
+            self.entity_position = (10, 10)
+        else:
+            self.direction_code = self.rng.randrange(len(DIRECTIONS))
+            self.entity_position = self.random_available_position()
+
+    def load_world(self, bank, index):
+        """ Replaces the world and the entity with a world of a WorldBank
+
+        Args:
+            bank (WorldBank): The bank of worlds
+            index (int): The world of the bank to load
+        """
+
+        xs, ys = bank.positions[index].T
+        self.grid.fill(0)
+        self.grid[xs, ys] = bank.mushrooms[index]
+        self.order[xs, ys] = np.arange(len(xs))
+        self.num_mushrooms = self.placed = len(xs)
+        self.index.reset()
+        for pos in zip(xs.tolist(), ys.tolist()):
+            self.index.add(pos)
+        self.entity_position = tuple(bank.starts[index].tolist())
+        self.direction_code = int(bank.directions[index])
+
+    def move_entity(self, action):
+        """ Moves the entity in the world according to the Action taken.
+
+        Args:
+            Action: The Action to be taken.
+        """
+
+        if action == Action.FORWARDS:
+            x = self.entity_position[X] + FORWARD_X[self.direction_code]
+            y = self.entity_position[Y] + FORWARD_Y[self.direction_code]
+            if 0 <= x < self.dim_x and 0 <= y < self.dim_y:
+                self.entity_position = (x, y)
+        elif action == Action.LEFT:
+            self.direction_code = TURN_LEFT[self.direction_code]
+        elif action == Action.RIGHT:
+            self.direction_code = TURN_RIGHT[self.direction_code]
+
+    def entity_facing_out(self):
+        """ Returns true if the entity is at the edge of the world and facing out
+        """
+        x = self.entity_position[X] + FORWARD_X[self.direction_code]
+        y = self.entity_position[Y] + FORWARD_Y[self.direction_code]
+        return not (0 <= x < self.dim_x and 0 <= y < self.dim_y)
+
+    def get_entity_angle_to_position(self, pos_to):
+        """ Returns the angle from the entity to a position, from 0 to 1.
+
+        The angle is measured clockwise where 0 is directly forwards.
+        It is looked up in the angle table of the world.
+
+        Args:
+            pos_to: The goal posision, within the world
+        Returns:
+            angle (float): The angle from 0 to 1.
+        """
+
+        x1, y1 = self.entity_position
+        x2, y2 = pos_to
+        return self.code_angles[self.direction_code][x2 - x1][y2 - y1]
+
+    def random_available_position(self):
+        """ Return a random available position within the world dimensions
+
+        Raises:
+            WorldFull: No space available
+        """
+
+        if self.num_mushrooms == self.dim_x * self.dim_y:
+            raise WorldFull("No available spaces remaining in world")
+        while True:
+            pos = self.rng.randrange(self.dim_x), self.rng.randrange(self.dim_y)
+            if self.grid.item(pos) == 0:
+                return pos
+
+    def get_cell(self, pos):
+        """ Returns the value of the cell at position pos, 0 if empty"""
+
+        return self.grid.item(pos)
+
+    def clear_cell(self, pos):
+        """ Clears the cell at a specified position """
+
+        if self.grid.item(pos) != 0:
+            self.grid[pos] = 0
+            self.num_mushrooms -= 1
+            self.index.remove(pos)
+
+
+# Environments that can be used for simulations
+ENVIRONMENTS = {"dict": Environment, "grid": GridEnvironment}
+
+
+class VectorEnvironment:
+    """ Many independent worlds of the same size, each with one entity, stored as stacked arrays
+
+    All of the worlds are reset, observed and stepped together. Actions are given
+    as the integer codes of Action. The closest mushroom is found as in Environment,
+    with ties broken in favour of the mushroom placed first.
+
+    Attributes:
+        num_worlds: The number of worlds
+        dim_x: The width of each world
+        dim_y: The height of each world
+        num_poisonous: The number of poisonous mushrooms placed in each world
+        num_edible: The number of edible mushrooms placed in each world
+        grid: Array of shape (num_worlds, dim_x, dim_y) of mushrooms, 0 if empty
+        order: Array of shape (num_worlds, dim_x, dim_y) of placement numbers
+        positions: Array of shape (num_worlds, 2) of entity positions
+        directions: Array of num_worlds direction codes (indices of DIRECTIONS)
+    """
+    def __init__(  #pylint: disable=R0913
+            self, num_worlds, width=20, height=20, poisonous=10, edible=10, generate=True):
+        """ Instantiate a new VectorEnvironment object, with every world reset if generating
+
+        Args:
+            num_worlds (int): The number of worlds
+            width (int): The width of each world
+            height (int): The height of each world
+            poisonous (int): The number of poisonous mushrooms to place in each world
+            edible (int): The number of edible mushrooms to place in each world
+            generate (bool): If false, the worlds are left empty to be loaded with load_world
+        Raises:
+            WorldFull: World is full
+        """
+
+        self.num_worlds = num_worlds
+        self.dim_x = width
+        self.dim_y = height
+        self.num_poisonous = poisonous
+        self.num_edible = edible
+        table = angle_table(width, height)
+        self.angles = np.array([table[direction] for direction in DIRECTIONS])
+        self.forward = np.array([FORWARD_X, FORWARD_Y]).T
+        self.turn_left = np.array(TURN_LEFT)
+        self.turn_right = np.array(TURN_RIGHT)
+        self.cell_x, self.cell_y = np.indices((width, height)).reshape(2, -1)
+        self.grid = np.zeros((num_worlds, width, height), dtype=np.int16)
+        self.order = np.zeros((num_worlds, width, height), dtype=np.int64)
+        self.positions = np.zeros((num_worlds, 2), dtype=int)
+        self.directions = np.zeros(num_worlds, dtype=int)
+        if generate:
+            self.reset()
+
+    def reset(self):
+        """ Reset every world
+
+        Places the mushrooms and the entity of each world in distinct random
+        cells, sampled without replacement, and gives each entity a random direction.
+
+        Raises:
+            WorldFull: World is full
+        """
+
+        num_cells = self.dim_x * self.dim_y
+        num_mushrooms = self.num_edible + self.num_poisonous
+        if num_mushrooms >= num_cells:
+            raise WorldFull("No available spaces remaining in world")
+
+        cells = np.argsort(np.random.random_sample((self.num_worlds, num_cells)),
+                           axis=1)[:, :num_mushrooms + 1]
+        mushrooms = np.where(np.arange(num_mushrooms) < self.num_edible, 0b1111100000,
+                             0b0000011111) ^ (1 << np.random.randint(0, 10, (self.num_worlds,
+                                                                             num_mushrooms)))
+        grid = np.zeros((self.num_worlds, num_cells), dtype=np.int16)
+        order = np.zeros((self.num_worlds, num_cells), dtype=np.int64)
+        np.put_along_axis(grid, cells[:, :num_mushrooms], mushrooms, axis=1)
+        np.put_along_axis(order, cells[:, :num_mushrooms], np.arange(num_mushrooms), axis=1)
+        self.grid = grid.reshape(self.num_worlds, self.dim_x, self.dim_y)
+        self.order = order.reshape(self.num_worlds, self.dim_x, self.dim_y)
+        self.positions = np.stack([self.cell_x[cells[:, -1]], self.cell_y[cells[:, -1]]], axis=1)
+        self.directions = np.random.randint(0, len(DIRECTIONS), self.num_worlds)
+
+    def load(self, index, env):
+        """ Copies the world and entity of an Environment into one of the worlds
+
+        Args:
+            index (int): The world to replace
+            env (Environment): The environment to copy, with its entity placed
+        """
+
+        self.grid[index] = 0
+        self.order[index] = 0
+        for number, (pos, mushroom) in enumerate(env.world.items()):
+            self.grid[index][pos] = mushroom
+            self.order[index][pos] = number
+        self.positions[index] = env.get_entity_position()
+        self.directions[index] = DIRECTIONS.index(env.entity_direction)
+
+    def load_world(self, bank, index):
+        """ Replaces every world and entity with the same world of a WorldBank
+
+        Args:
+            bank (WorldBank): The bank of worlds
+            index (int): The world of the bank to load
+        """
+
+        xs, ys = bank.positions[index].T
+        self.grid.fill(0)
+        self.order.fill(0)
+        self.grid[:, xs, ys] = bank.mushrooms[index]
+        self.order[:, xs, ys] = np.arange(len(xs))
+        self.positions[:] = bank.starts[index]
+        self.directions[:] = bank.directions[index]
+
+    def observe(self, active=None):
+        """ Returns the perceptual inputs of the entity in each world
+
+        Args:
+            active: Boolean array of the worlds to observe (defaults to every world)
+        Returns:
+            (angles, perceptions, closest): Arrays of the angle to the closest mushroom,
+                the closest mushroom if it is adjacent (0 otherwise) and the closest
+                mushroom (0 if there are no mushrooms left in the world), with 0 for
+                every world that is not observed
+        """
+
+        worlds = np.arange(self.num_worlds) if active is None else np.flatnonzero(active)
+        grid = self.grid.reshape(self.num_worlds, -1)[worlds]
+        x = self.positions[worlds, X, np.newaxis]
+        y = self.positions[worlds, Y, np.newaxis]
+        distances = np.abs(self.cell_x - x) + np.abs(self.cell_y - y)
+        keys = np.where(grid != 0,
+                        distances * grid.shape[1] + self.order.reshape(self.num_worlds, -1)[worlds],
+                        np.iinfo(np.int64).max)
+        cells = keys.argmin(axis=1)
+
+        angles = np.zeros(self.num_worlds)
+        perceptions = np.zeros(self.num_worlds, dtype=int)
+        closest = np.zeros(self.num_worlds, dtype=int)
+        closest[worlds] = grid[np.arange(len(worlds)), cells]
+        dx = self.cell_x[cells] - x[:, 0]
+        dy = self.cell_y[cells] - y[:, 0]
+        angles[worlds] = self.angles[self.directions[worlds], dx, dy]
+        perceptions[worlds] = np.where((np.abs(dx) <= 1) & (np.abs(dy) <= 1), closest[worlds], 0)
+        return angles, perceptions, closest
+
+    def facing_out(self):
+        """ Returns whether the entity in each world is at the edge and facing out """
+
+        ahead = self.positions + self.forward[self.directions]
+        return ~self.within_bounds(ahead)
+
+    def within_bounds(self, positions):
+        """ Checks whether each of an array of positions is within the worlds """
+
+        return ((positions[:, X] >= 0) & (positions[:, X] < self.dim_x) & (positions[:, Y] >= 0) &
+                (positions[:, Y] < self.dim_y))
+
+    def step(self, actions, active=None):
+        """ Moves the entity in each world according to its action, eating any mushroom reached
+
+        Args:
+            actions: Array of Action codes, one per world
+            active: Boolean array of the worlds to step (defaults to every world)
+        Returns:
+            eaten: Array of the mushroom eaten in each world, 0 if none
+        """
+
+        actions = np.asarray(actions)
+        if active is None:
+            active = np.ones(self.num_worlds, dtype=bool)
+
+        ahead = self.positions + self.forward[self.directions]
+        move = active & (actions == Action.FORWARDS.value) & self.within_bounds(ahead)
+        self.positions[move] = ahead[move]
+        left = active & (actions == Action.LEFT.value)
+        self.directions[left] = self.turn_left[self.directions[left]]
+        right = active & (actions == Action.RIGHT.value)
+        self.directions[right] = self.turn_right[self.directions[right]]
+
+        worlds = np.flatnonzero(active)
+        x = self.positions[worlds, X]
+        y = self.positions[worlds, Y]
+        eaten = np.zeros(self.num_worlds, dtype=int)
+        eaten[worlds] = self.grid[worlds, x, y]
+        self.grid[worlds, x, y] = 0
+        return eaten
+
+
+class WorldBank:
+    """ A bank of worlds, with the start of the entity in each, generated once
+
+    Each world is stored as the positions of its mushrooms, in the order they
+    were placed, the mushrooms themselves, and the position and direction code
+    of the entity. Worlds are generated by an Environment in the same way as
+    in run_single, so loading the bank gives the worlds that an environment
+    generated from the same rng would.
+
+    Attributes:
+        positions: Array of shape (num_worlds, num_mushrooms, 2) of mushroom positions
+        mushrooms: Array of shape (num_worlds, num_mushrooms) of mushrooms
+        starts: Array of shape (num_worlds, 2) of the starting position of the entity
+        directions: Array of num_worlds starting direction codes (indices of DIRECTIONS)
+    """
+    def __init__(  #pylint: disable=R0913
+            self, num_worlds, width=20, height=20, poisonous=10, edible=10, rng=None):
+        """ Generate a new bank of worlds
+
+        Args:
+            num_worlds (int): The number of worlds
+            width (int): The width of each world
+            height (int): The height of each world
+            poisonous (int): The number of poisonous mushrooms to place in each world
+            edible (int): The number of edible mushrooms to place in each world
+            rng: A random.Random to generate the worlds from, the random module if not given
+        Raises:
+            WorldFull: World is full
+        """
+
+        num_mushrooms = poisonous + edible
+        self.positions = np.zeros((num_worlds, num_mushrooms, 2), dtype=np.int16)
+        self.mushrooms = np.zeros((num_worlds, num_mushrooms), dtype=np.int16)
+        self.starts = np.zeros((num_worlds, 2), dtype=np.int16)
+        self.directions = np.zeros(num_worlds, dtype=np.int8)
+
+        env = Environment(width, height, poisonous, edible, rng=rng)
+        for i in range(num_worlds):
+            if i > 0:
+                env.reset()
+            env.place_entity()
+            self.positions[i] = list(env.world.keys())
+            self.mushrooms[i] = list(env.world.values())
+            self.starts[i] = env.entity_position
+            self.directions[i] = DIRECTION_CODES[env.entity_direction]
+
+    def __len__(self):
+        """ Returns the number of worlds in the bank """
+
+        return len(self.starts)
+
+
+# -- Utility methods for angles -- #
+
+
+def angle_between(pos_from, pos_to, direction):
+    """ Returns the angle from one position to another, from 0 to 1.
+
+    The angle is measured clockwise where 0 is the direction given.
+
+    Args:
+        pos_from: The starting position
+        pos_to: The goal position
+        direction: The direction faced at the starting position
+    Returns:
+        angle (float): The angle from 0 to 1.
+    """
+
+    x1, y1 = pos_from
+    x2, y2 = pos_to
+    if x1 == x2 and y1 == y2:
+        return 0
+    angle = -math.degrees(math.atan2(y1 - y2, x2 - x1))
+    if direction == Direction.NORTH:
+        angle += 90
+    if direction == Direction.WEST:
+        angle += 180
+    if direction == Direction.SOUTH:
+        angle -= 90
+    return (angle % 360) / 360
+
+
+def angle_table(width, height):
+    """ Returns a table of the angles between any two positions in a world
+
+    The table is computed once per world size. table[direction][dx][dy] is the
+    angle to a position dx cells along and dy cells down when facing direction,
+    where negative offsets index from the end of each list.
+
+    Args:
+        width (int): The width of the world
+        height (int): The height of the world
+    Returns:
+        table: Dictionary from Direction to a (2 * width - 1) by (2 * height - 1) list
+    """
+
+    if (width, height) not in ANGLE_TABLES:
+        size_x = 2 * width - 1
+        size_y = 2 * height - 1
+        table = {}
+        for direction in Direction:
+            table[direction] = [[0] * size_y for _ in range(size_x)]
+            for dx in range(-(width - 1), width):
+                for dy in range(-(height - 1), height):
+                    table[direction][dx][dy] = angle_between((0, 0), (dx, dy), direction)
+        ANGLE_TABLES[(width, height)] = table
+    return ANGLE_TABLES[(width, height)]
+
+
+def reachable_angles(width, height, max_offset=None):
+    """ Returns every angle an entity can perceive to a position in a world, sorted.
+
+    The angles are computed once per world size and offset.
+
+    Args:
+        width (int): The width of the world
+        height (int): The height of the world
+        max_offset (int): Only consider positions at most this many cells away
+            along each axis (defaults to the whole world)
+    Returns:
+        angles (float[]): The distinct angles from 0 to 1
+    """
+
+    max_x = width - 1 if max_offset is None else min(max_offset, width - 1)
+    max_y = height - 1 if max_offset is None else min(max_offset, height - 1)
+    key = (width, height, max_x, max_y)
+    if key not in REACHABLE_ANGLES:
+        angles = set()
+        for table in angle_table(width, height).values():
+            for dx in range(-max_x, max_x + 1):
+                for dy in range(-max_y, max_y + 1):
+                    angles.add(table[dx][dy])
+        REACHABLE_ANGLES[key] = sorted(angles)
+    return REACHABLE_ANGLES[key]
+
+
 # -- Various utility methods for mushrooms -- #
 
 
@@ -369,7 +1255,7 @@ def is_edible(cell):
     """ Checks if a mushroom is edible """
 
     lower_bits = cell & 0b111
-    return not (lower_bits - 1) & lower_bits
+    return (lower_bits - 1) & lower_bits == 0
 
 
 def is_poisonous(cell):
@@ -378,6 +1264,12 @@ def is_poisonous(cell):
     return not is_edible(cell)
 
 
+def all_mushrooms():
+    """ Returns every edible and poisonous mushroom that can be generated """
+
+    return [make_edible(i) for i in range(10)] + [make_poisonous(i) for i in range(10)]
+
+
 def mutate(mushroom, i):
     """ Randomly flips one bit in a mushroom bit string"""
 
@@ -0,0 +1,78 @@
+"""
+This module holds the genetic algorithm on a population held as a matrix of genomes.
+
+Each row of the matrix is the genome of one entity, as laid out by
+entity.genome_views, so a whole generation is selected and reproduced with a few
+array operations rather than by sorting and copying entity objects. Only the
+fitness of each entity is needed, so any way of evaluating the population can be
+used to produce it.
+"""
+
+import numpy as np
+
+from simulating.entity import mutate
+
+# The number of parameters mutated at once, which bounds the memory used by mutation
+CHUNK_PARAMETERS = 1 << 22
+
+
+def select_best(fitness, num_keep):
+    """ Returns the indices of the entities with the highest fitness
+
+    Entities with equal fitness are ranked by their position in the population,
+    earliest first, which is the order a stable sort by decreasing fitness gives.
+
+    Args:
+        fitness: Array of the fitness of each entity
+        num_keep: The number of entities to select
+    Returns:
+        indices: Array of the num_keep best entities, from best to worst
+    """
+
+    fitness = np.asarray(fitness)
+    num_keep = min(num_keep, len(fitness))
+    if num_keep == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # Everything above the kth largest fitness is kept, then the earliest of those
+    # equal to it fill the remaining places
+    threshold = fitness[np.argpartition(fitness, len(fitness) - num_keep)[len(fitness) - num_keep]]
+    above = np.flatnonzero(fitness > threshold)
+    equal = np.flatnonzero(fitness == threshold)[:num_keep - len(above)]
+    best = np.concatenate((above, equal))
+
+    # Rank the selected entities by decreasing fitness, then by position
+    return best[np.lexsort((best, -fitness[best]))]
+
+
+def reproduce(genomes, fitness, num_keep, num_offspring, percentage_mutate, out=None):
+    """ Create the genomes of the next generation through asexual reproduction
+
+    The num_keep fittest genomes each produce num_offspring children, placed in
+    consecutive rows from the best parent to the worst. The children are copied
+    and mutated in chunks, so the memory used is that of the new matrix.
+
+    Args:
+        genomes: Matrix of the genome of each entity, one per row
+        fitness: Array of the fitness of each entity
+        num_keep: The number of entities that reproduce
+        num_offspring: The number of children of each entity
+        percentage_mutate: The probability of each parameter being mutated
+        out: Matrix to write the new genomes to, which must not overlap genomes
+    Returns:
+        children: Matrix of shape (num_keep * num_offspring, genome size)
+    """
+
+    parents = select_best(fitness, num_keep)
+    num_children = len(parents) * num_offspring
+    if out is None:
+        out = np.empty((num_children, genomes.shape[1]), dtype=genomes.dtype)
+    children = out[:num_children]
+
+    chunk = max(1, CHUNK_PARAMETERS // max(1, genomes.shape[1]))
+    for start in range(0, num_children, chunk):
+        stop = min(start + chunk, num_children)
+        np.take(genomes, parents[np.arange(start, stop) // num_offspring], axis=0,
+                out=children[start:stop])
+        mutate(children[start:stop], percentage_mutate)
+    return children
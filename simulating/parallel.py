@@ -0,0 +1,186 @@
+"""
+This module holds the pool of worker processes used to run a population in parallel.
+
+The pool is created once per run and each worker is initialised once with the
+simulation and the NetworkConfig of the population. Each generation, the genomes
+of the population are published to a block of shared memory, workers are only
+sent the index of an entity, and they send back only its EvaluationStats. For the
+Evolved language, the partners drawn for each entity are also published, and
+each worker keeps a SignalTable of the current generation.
+"""
+
+from multiprocessing import Pool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from simulating.entity import NeuralEntity
+from simulating.entity import genome_size
+from simulating.stats import EvaluationStats
+
+# The simulation run by this worker process and the NetworkConfig of its population,
+# set when the worker is initialised
+SIMULATION = None
+CONFIG = None
+
+# The shared population of this worker process and entities backed by it
+SHARED = None
+ENTITIES = []
+
+# The generation and SignalTable of the population last evaluated by this worker
+GENERATION = None
+TABLE = None
+
+# The seed and WorldBank of the worlds last shared by a population evaluated by this worker
+WORLD_SEED = None
+WORLDS = None
+
+
+class SharedPopulation:
+    """ The genomes of a population, held in shared memory
+
+    The genomes are the rows of a (capacity, genome size) matrix, so the stacked
+    parameters of the population are views of it as given by genome_views. The
+    partners drawn for each entity have shape (capacity, num_draws).
+
+    Attributes:
+        config: The NetworkConfig of the population
+        capacity: The largest population that can be held
+        memory: The block of shared memory
+        genomes: View of the genome of each entity
+        num_draws: The number of partners drawn for each entity
+        partners: View of the partners drawn for each entity
+    """
+    def __init__(self, config, capacity, name=None, num_draws=0):
+        """ Create a new block of shared memory, or attach to an existing one
+
+        Args:
+            config: The NetworkConfig of the population
+            capacity: The largest population that can be held
+            name: The name of an existing block to attach to
+            num_draws: The number of partners drawn for each entity
+        """
+
+        self.config = config
+        self.capacity = capacity
+        self.num_draws = num_draws
+        size = genome_size(config.layers_units)
+
+        # The partners follow the genomes, aligned to 8 bytes
+        offset = -(-capacity * size * config.dtype.itemsize // 8) * 8
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True,
+                                                     size=offset + capacity * num_draws * 8)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+
+        self.genomes = np.ndarray((capacity, size), dtype=config.dtype, buffer=self.memory.buf)
+        self.partners = np.ndarray((capacity, num_draws), dtype=np.int64, buffer=self.memory.buf,
+                                   offset=offset)
+
+    def publish(self, entities, partners=None):
+        """ Copies the genomes of a population into shared memory
+
+        Args:
+            entities: The neural entities, no more than the capacity
+            partners: The partners drawn for each entity, if any
+        """
+
+        for i, entity in enumerate(entities):
+            self.genomes[i] = entity.genome
+        if partners is not None:
+            self.partners[:len(entities)] = partners
+
+    def entity(self, index):
+        """ Returns a neural entity whose genome is a view of shared memory
+
+        Args:
+            index: The position of the entity in the population
+        """
+
+        return NeuralEntity(0, genome=self.genomes[index], config=self.config)
+
+    def close(self, unlink=False):
+        """ Detach from the shared memory, also freeing it if unlink is true """
+
+        self.genomes = self.partners = None
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+def initialise_worker(simulation, config, shared=None):
+    """ Set up a worker process to run entities in a simulation
+
+    Everything the worker needs is given here rather than inherited from the
+    parent process, so workers can be started with any start method.
+
+    Args:
+        simulation: The simulation whose settings are used to run entities
+        config: The NetworkConfig of the population
+        shared: The (name, capacity, num_draws) of the shared population
+    """
+
+    global SIMULATION, CONFIG, SHARED, ENTITIES  #pylint: disable=W0603
+    SIMULATION = simulation
+    CONFIG = config
+    if shared is not None:
+        name, capacity, num_draws = shared
+        SHARED = SharedPopulation(config, capacity, name, num_draws)
+        ENTITIES = [SHARED.entity(i) for i in range(capacity)]
+
+
+def make_pool(simulation, config, shared=None):
+    """ Create a pool of workers initialised for a simulation
+
+    Args:
+        simulation: The simulation whose settings are used to run entities
+        config: The NetworkConfig of the population
+        shared: The shared population that workers evaluate, if any
+    Returns:
+        pool: The pool of worker processes
+    """
+
+    if shared is not None:
+        shared = (shared.memory.name, shared.capacity, shared.num_draws)
+    return Pool(initializer=initialise_worker, initargs=(simulation, config, shared))
+
+
+def evaluate(index, num_entities, generation=None, world_seed=None):
+    """ Run a single simulation for one entity of the shared population
+
+    For the Evolved language, the partners drawn for the entity name mushrooms by
+    looking them up in a SignalTable created for each new generation. With shared
+    worlds, the WorldBank is generated again from its seed, once per seed.
+
+    Args:
+        index: The position of the entity in the population
+        num_entities: The size of the population
+        generation: The generation the population belongs to
+        world_seed: The seed of the worlds shared by the population, if they are shared
+    Returns:
+        stats: The EvaluationStats of the simulation
+    """
+
+    global GENERATION, TABLE, WORLD_SEED, WORLDS  #pylint: disable=W0603
+    if generation is None or generation != GENERATION:
+        GENERATION = generation
+        TABLE = SIMULATION.signal_table(ENTITIES[:num_entities])
+    if world_seed != WORLD_SEED:
+        WORLD_SEED = world_seed
+        WORLDS = None if world_seed is None else SIMULATION.make_world_bank(world_seed)
+
+    entity = ENTITIES[index]
+    entity.fitness = 0
+    population = []
+    if TABLE is not None:
+        population = TABLE.excluding(index, SHARED.partners[index])
+    stats = EvaluationStats()
+    SIMULATION.run_single(entity, population, stats=stats, worlds=WORLDS)
+    return stats
+
+
+def naming_task(entity):
+    """ Perform the naming task for one entity in the worker's simulation """
+
+    return SIMULATION.naming_task(entity)
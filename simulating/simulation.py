@@ -7,6 +7,7 @@ return the final fitness of the initial entities given.
 """
 
 import argparse
+import itertools
 import math
 import os
 import random
@@ -15,15 +16,46 @@ import time
 
 from enum import Enum
 
-from multiprocessing import Pool
+import numpy as np
 
-from analysis.plotting import Plotter
 from simulating.action import Action
 import simulating.entity
+from simulating.entity import NetworkConfig
 from simulating.entity import NeuralEntity
-from simulating.environment import Environment
+from simulating.entity import default_config
+from simulating.entity import genome_size
 from simulating import environment
-from simulating.entity import array_to_bits
+from simulating import genetic
+from simulating import parallel
+from simulating.entity import bits_to_array
+from simulating.entity import make_inputs
+from simulating.entity import SignalTable
+from simulating.stats import EvaluationStats
+from simulating.stats import EXIT_REASONS
+from simulating.stats import METRICS
+from simulating.stats import PHASES
+from simulating.stats import PhaseTimes
+from simulating.stats import combine
+
+# Optimisations enabled by "-O all"
+ALL_OPTIMISATIONS = ["parallel", "skip_none", "skip_facing_out", "detect_looping"]
+
+# Optimisations that can be given to -O as a comma-separated list
+OPTIMISATIONS = ["none", "all"] + ALL_OPTIMISATIONS + [
+    "lockstep", "compile", "world_bank", "deduplicate", "detect_cycles", "fast_forward"
+]
+
+# The number of activations computed at once when grouping entities by behaviour
+CHUNK_ACTIVATIONS = 1 << 22
+
+
+def parse_optimisation(optimisation):
+    """ Returns the set of optimisations in a comma-separated string, expanding "all" """
+
+    modes = set(optimisation.split(","))
+    if "all" in modes:
+        modes.update(ALL_OPTIMISATIONS)
+    return modes
 
 
 class Language(Enum):
@@ -63,11 +95,29 @@ class Simulation:  #pylint: disable=R0903
     percentage_mutate = 0.1
     percentage_keep = 0.2
 
+    # Seed for the random draws of the simulation, None for an unseeded run
+    seed = None
+
     # Optimisation parameters
     optimisation = ""
     threading = True
     skip_none = True
     skip_facing_out = True
+    detect_looping = True
+    detect_cycles = False
+    fast_forward = False
+    lockstep = False
+    compiled = False
+    shared_worlds = False
+    deduplicate = False
+
+    # World parameters
+    world_width = 20
+    world_height = 20
+    num_edible = 10
+    num_poisonous = 10
+    environment_type = "dict"
+    spatial_index = None
 
     # I/O parameters
     interactive = False
@@ -80,6 +130,7 @@ class Simulation:  #pylint: disable=R0903
 
     record_fitness = True
     record_time = True
+    record_metrics = True
 
     foldername = "folder"
 
@@ -94,7 +145,8 @@ class Simulation:  #pylint: disable=R0903
                  language_type,
                  percentage_mutate=0.1,
                  percentage_keep=0.2,
-                 optimisation="all"):
+                 optimisation="all",
+                 seed=None):
         self.num_epochs = epochs
         self.num_cycles = cycles
         self.num_entities = population_size
@@ -104,10 +156,24 @@ class Simulation:  #pylint: disable=R0903
         self.percentage_keep = percentage_keep
         self.languages = []
         self.optimisation = optimisation
-        self.threading = optimisation in ["all", "parallel"]
-        self.skip_none = optimisation in ["all", "skip_none"]
-        self.skip_facing_out = optimisation in ["all", "skip_facing_out"]
-        self.detect_looping = optimisation in ["all", "detect_looping"]
+        self.seed = seed
+        modes = parse_optimisation(optimisation)
+        self.threading = "parallel" in modes
+        self.skip_none = "skip_none" in modes
+        self.skip_facing_out = "skip_facing_out" in modes
+        self.detect_looping = "detect_looping" in modes
+        self.lockstep = "lockstep" in modes
+        # With eight possible signals, compiling an Evolved entity costs more passes than
+        # the epochs it is compiled for
+        self.compiled = "compile" in modes and self.language_type != Language.EVOLVED
+        # Deduplication needs fitness to depend only on behaviour, so not on partners,
+        # and needs every entity to be run in the same worlds
+        self.deduplicate = "deduplicate" in modes and self.language_type != Language.EVOLVED
+        self.shared_worlds = "world_bank" in modes or self.deduplicate
+        # A state only determines the rest of an epoch if partners do not change the signal
+        self.detect_cycles = ("detect_cycles" in modes and
+                              self.language_type != Language.EVOLVED)
+        self.fast_forward = "fast_forward" in modes and self.language_type != Language.EVOLVED
 
     def set_io_options(self,
                        interactive=False,
@@ -117,7 +183,8 @@ class Simulation:  #pylint: disable=R0903
                        record_entities_period=1,
                        record_fitness=True,
                        record_time=True,
-                       foldername="folder"):
+                       foldername="folder",
+                       record_metrics=True):
         """ Set options that determine I/O """
 
         self.interactive = interactive
@@ -128,8 +195,42 @@ class Simulation:  #pylint: disable=R0903
         self.record_fitness = record_fitness
         self.record_time = record_time
         self.foldername = foldername
+        self.record_metrics = record_metrics
+
+    def set_world_options(self,
+                          width=20,
+                          height=20,
+                          edible=10,
+                          poisonous=10,
+                          environment_type="dict",
+                          spatial_index=None):
+        """ Set options that determine the worlds entities are simulated in
+
+        The environment is an ENVIRONMENTS entry and the spatial index a SPATIAL_INDEXES
+        entry, where None uses the default index of the environment.
+        """
+
+        self.world_width = width
+        self.world_height = height
+        self.num_edible = edible
+        self.num_poisonous = poisonous
+        self.environment_type = environment_type
+        self.spatial_index = spatial_index
 
-    def run_single(self, entity, population=[], viewer=False):
+    def make_environment(self, generate=True):
+        """ Returns a new environment using the world options
+
+        Args:
+            generate (bool): If false, the world is left empty to be loaded with load_world
+        """
+
+        options = {} if self.spatial_index is None else {"spatial_index": self.spatial_index}
+        make = environment.ENVIRONMENTS[self.environment_type]
+        return make(self.world_width, self.world_height, self.num_poisonous, self.num_edible,
+                    generate=generate, **options)
+
+    def run_single(  #pylint: disable=W0102,R0913
+            self, entity, population=[], viewer=False, stats=None, worlds=None):
         """ Runs a single simulation for one entity
 
         Runs num_epochs epochs, each of which contains num_cycles time steps.
@@ -140,42 +241,94 @@ class Simulation:  #pylint: disable=R0903
         Args:
             entity: The entity whose behaviour is tested        
             at each step.
-            population: The remaining entities in the population
+            population: The remaining entities in the population, or their SignalTable
             viewer (bool): If true, prints debugging information and pauses
+            stats: An EvaluationStats to record the simulation in, if given
+            worlds: A WorldBank with a world for each epoch, shared with the rest of the
+                generation (new worlds are generated for each epoch if not given)
         """
 
-        env = Environment()
-        env.place_entity()
+        env = self.make_environment(worlds is None)
+        if worlds is None:
+            env.place_entity()
+        else:
+            env.load_world(worlds, 0)
 
         if viewer:
             print("Entity weights: \n", entity.weights)
             print("Entities biases: \n", entity.biases)
 
+        # Replace the network with a lookup table if compiling
+        behaviour = entity.behaviour
+        compiled = self.compiled and isinstance(entity, NeuralEntity) and not viewer
+        if compiled:
+            table = self.compile_entity(entity)
+            behaviour = table.behaviour
+            if stats is not None:
+                stats.passes += len(table.outputs)
+
+        start_fitness = entity.fitness
+        fast_forward = self.fast_forward and not viewer
+
         # Run num_epochs epochs of num_cycles cycles each
         for epoch in range(self.num_epochs):
 
-            # Store previous actions for optimisations
+            # Store previous actions and states since the last meal for optimisations
             previous_actions = []
+            visited = set()
+            reason = "completed"
+            start_steps = 0 if stats is None else stats.steps
+            forward_steps = 0
 
             for step in range(self.num_cycles):
 
                 # Get entity position and closest mushroom
                 entity_pos = env.get_entity_position()
-                try:
-                    mush_pos = env.closest_mushroom(entity_pos)
-                except environment.MushroomNotFound:
-                    # Skip cycle if all mushrooms have been eaten
-                    break
-
-                # Calculate the angle and get mushroom properties if close enough
-                angle = env.get_entity_angle_to_position(mush_pos)
-                mush = env.get_cell(mush_pos) if env.adjacent(entity_pos, mush_pos) else 0
-
-                # Get audio signal according to language type
-                signal = self.get_signal(angle, env.get_cell(mush_pos), population, viewer)
 
-                # Get the behaviour of the entity given perceptual inputs
-                action, out_signal = entity.behaviour(angle, mush, signal)
+                # Until the entity eats, the world is fixed, so its inputs and behaviour
+                # depend only on its position and direction. A repeated state means the
+                # rest of the epoch is a cycle in which nothing is eaten.
+                if self.detect_cycles:
+                    state = (entity_pos, env.entity_direction)
+                    if state in visited:
+                        reason = "detect_cycles"
+                        break
+                    visited.add(state)
+
+                # Walking straight at a mushroom, the inputs stay the same until it is
+                # adjacent, so the entity keeps moving forwards without being asked
+                if forward_steps:
+                    forward_steps -= 1
+                else:
+                    if stats is not None:
+                        stats.searches += 1
+                    try:
+                        mush_pos = env.closest_mushroom(entity_pos)
+                    except environment.MushroomNotFound:
+                        # Skip cycle if all mushrooms have been eaten
+                        reason = "no_mushrooms"
+                        break
+
+                    # Calculate the angle and get mushroom properties if close enough
+                    angle = env.get_entity_angle_to_position(mush_pos)
+                    mush = env.get_cell(mush_pos) if env.adjacent(entity_pos, mush_pos) else 0
+
+                    # Get audio signal according to language type
+                    signal = self.get_signal(angle, env.get_cell(mush_pos), population, viewer)
+
+                    # Get the behaviour of the entity given perceptual inputs
+                    action, out_signal = behaviour(angle, mush, signal)
+                    if stats is not None and not compiled:
+                        stats.passes += 1
+
+                    # The mushroom stays the closest as the entity approaches it, as no other
+                    # gets closer faster, so this is repeated until it is one cell away
+                    if fast_forward and action == Action.FORWARDS and angle == 0 and not mush:
+                        forward_steps = (abs(mush_pos[0] - entity_pos[0]) +
+                                         abs(mush_pos[1] - entity_pos[1]) - 2)
+
+                if stats is not None:
+                    stats.steps += 1
 
                 # Print debug information
                 if viewer:
@@ -194,28 +347,11 @@ class Simulation:  #pylint: disable=R0903
                     if usr_input == chr(27):
                         return entity
 
-                # If the action is NOTHING, it will stay that way,
-                # so we can make some optimisations
-                if self.skip_none and action == Action.NOTHING:
+                # Skip the rest of the epoch if the behaviour can no longer change
+                reason = self.epoch_finished(action, env, previous_actions, step) or reason
+                if reason != "completed":
                     break
 
-                # We can also break if the entity tries to move forward but can't
-                if self.skip_facing_out and action == Action.FORWARDS and env.entity_facing_out():
-                    break
-
-                # Detect if the entity is spinning forever by examining previous three actions
-                if self.detect_looping:
-                    previous_actions.append(action)
-                    if step > 2:
-                        if action in [Action.LEFT, Action.RIGHT]:
-                            looping = True
-                            for prev in previous_actions:
-                                if prev != action:
-                                    looping = False
-                            if looping:
-                                break
-                        previous_actions = previous_actions[1:4]
-
                 # Do the action
                 env.move_entity(action)
 
@@ -223,16 +359,353 @@ class Simulation:  #pylint: disable=R0903
                 new_pos = env.get_entity_position()
                 if env.is_mushroom(new_pos):
                     entity.eat(env.get_cell(new_pos))
+                    if stats is not None:
+                        stats.eat(env.get_cell(new_pos))
                     env.clear_cell(new_pos)
+                    visited.clear()
                     if viewer:
                         print("EATING MUSHROOM")
 
+            if stats is not None:
+                stats.end_epoch(reason, self.num_cycles - (stats.steps - start_steps))
+
             # After an epoch, reset the world and replace the entity
-            env.reset()
-            env.place_entity()
+            if worlds is None:
+                env.reset()
+                env.place_entity()
+            elif epoch + 1 < self.num_epochs:
+                env.load_world(worlds, epoch + 1)
+
+        if stats is not None:
+            stats.fitness += entity.fitness - start_fitness
 
         return entity
 
+    def compile_entity(self, entity):
+        """ Compiles the behaviour of an entity over every input it can perceive
+
+        Args:
+            entity: The neural entity to compile
+        Returns:
+            table: A BehaviourTable with the same behaviour as the entity
+        """
+
+        return entity.compile(self.observations(), self.listenings())
+
+    def observations(self):
+        """ Returns every (angle, mushroom input) pair an entity can perceive in the worlds
+        """
+
+        width, height = self.world_width, self.world_height
+        observations = [(angle, 0) for angle in environment.reachable_angles(width, height)]
+        observations += [(angle, mush) for angle in environment.reachable_angles(width, height, 1)
+                         for mush in environment.all_mushrooms()]
+        return observations
+
+    def behaviour_classes(self, entities):
+        """ Groups neural entities that choose the same action for every input they can perceive
+
+        Only the actions are compared, so with no partners and the same worlds, entities
+        in the same group have the same fitness. The networks are evaluated over every
+        input in batches of entities, bounding the memory used by the activations.
+
+        Args:
+            entities: The neural entities, all with the same network configuration
+        Returns:
+            (representatives, classes): Array of the first entity of each group, and array
+                of the position in representatives of the group of each entity
+        """
+
+        combinations = list(itertools.product(self.observations(), self.listenings()))
+        inputs = make_inputs([location for (location, _), _ in combinations],
+                             [perception for (_, perception), _ in combinations],
+                             [listening for _, listening in combinations])
+        config = entities[0].config
+        chunk = max(1, CHUNK_ACTIVATIONS // (len(combinations) * max(config.layers_units)))
+
+        actions = np.empty((len(entities), len(combinations)), dtype=np.uint8)
+        for start in range(0, len(entities), chunk):
+            weights, biases = simulating.entity.stack_parameters(entities[start:start + chunk])
+            outputs = simulating.entity.feed_forward(weights, biases, inputs, config)
+            actions[start:start + chunk] = 2 * outputs[:, 0] + outputs[:, 1]
+
+        _, representatives, classes = np.unique(actions, axis=0, return_index=True,
+                                                return_inverse=True)
+        return representatives, classes.ravel()
+
+    def world_seed(self, generation):
+        """ Returns the seed of the worlds shared by the entities of a generation
+
+        The seed is reproducible from the seed of the simulation, if it has one.
+        """
+
+        if self.seed is None:
+            return random.getrandbits(64)
+        return int(np.random.default_rng([self.seed, generation, 1]).integers(1 << 62))
+
+    def make_world_bank(self, world_seed):
+        """ Returns a WorldBank of a world for each epoch, using the world options
+
+        Args:
+            world_seed: The seed the worlds are generated from
+        """
+
+        return environment.WorldBank(self.num_epochs, self.world_width, self.world_height,
+                                     self.num_poisonous, self.num_edible,
+                                     random.Random(world_seed))
+
+    def listenings(self):
+        """ Returns every audio signal an entity can hear with this language type
+        """
+
+        if self.language_type == Language.NONE:
+            return [[0.5, 0.5, 0.5]]
+        if self.language_type == Language.EXTERNAL:
+            return [[1, 0, 0], [0, 1, 0]]
+        return [bits_to_array(i, 3) for i in range(8)]
+
+    def partners_of(self, index, table, partners=None):
+        """ Returns the partners of an entity to pass to run_single
+
+        Args:
+            index: The position of the entity in the population
+            table: The SignalTable of the population, or None if there are no partners
+            partners: The partners drawn for each entity by draw_partners, if any
+        Returns:
+            population: The table excluding the entity, or an empty population
+        """
+
+        if table is None:
+            return []
+        return table.excluding(index, None if partners is None else partners[index])
+
+    def draw_partners(self, num_entities, generation=0):
+        """ Draws the partner of each entity at each time step of a generation
+
+        The partners are reproducible from the seed of the simulation, if it has one.
+
+        Args:
+            num_entities: The size of the population
+            generation: The generation the partners are drawn for
+        Returns:
+            partners: Array of shape (num_entities, num_epochs * num_cycles)
+        """
+
+        rng = np.random.default_rng(None if self.seed is None else [self.seed, generation])
+        return simulating.entity.draw_partners(num_entities, self.num_epochs * self.num_cycles,
+                                               rng)
+
+    def signal_table(self, entities):
+        """ Creates a table of the signal each entity of a population gives as a partner
+
+        Args:
+            entities: The neural entities of the population
+        Returns:
+            table: A SignalTable over every angle and mushroom that can be named,
+                or None if the language type has no partners
+        """
+
+        if self.language_type != Language.EVOLVED:
+            return None
+        angles = environment.reachable_angles(self.world_width, self.world_height)
+        return SignalTable(entities, angles, environment.all_mushrooms())
+
+    def epoch_finished(self, action, env, previous_actions, step):
+        """ Returns whether the rest of an epoch can be skipped given the action chosen
+
+        Args:
+            action: The action chosen by the entity at this step
+            env: The environment the entity is in, before the action is taken
+            previous_actions: The actions taken in the previous steps, updated in place
+            step: The current step of the epoch
+        Returns:
+            reason: The optimisation that skips the rest of the epoch, or None
+        """
+
+        # If the action is NOTHING, it will stay that way,
+        # so we can make some optimisations
+        if self.skip_none and action == Action.NOTHING:
+            return "skip_none"
+
+        # We can also break if the entity tries to move forward but can't
+        if self.skip_facing_out and action == Action.FORWARDS and env.entity_facing_out():
+            return "skip_facing_out"
+
+        # Detect if the entity is spinning forever by examining previous three actions
+        if self.detect_looping:
+            previous_actions.append(action)
+            if step > 2:
+                if action in [Action.LEFT, Action.RIGHT]:
+                    looping = True
+                    for prev in previous_actions:
+                        if prev != action:
+                            looping = False
+                    if looping:
+                        return "detect_looping"
+                del previous_actions[0]
+
+        return None
+
+    def run_lockstep(  #pylint: disable=W0102,R0913
+            self, entities, population=[], partners=None, stats=None, worlds=None):
+        """ Runs a single simulation for every entity of a population at once
+
+        Each entity lives in its own world of a VectorEnvironment, as in run_single,
+        but all of the entities are advanced together one time step at a time. The
+        environment and spatial index options do not apply here. At each step the
+        inputs of every entity still in the epoch are gathered and the networks
+        of all of these entities are evaluated with one batched matrix
+        multiplication per layer. Entities leave an epoch under the same
+        conditions as in run_single. Fast forwarding does not apply either, as
+        the networks of the entities are evaluated together.
+
+        Args:
+            entities: The neural entities to simulate, all with the same network shape
+            population: Copies of the entities, or their SignalTable, used as partners
+                for the Evolved language
+            partners: The partners drawn for each entity by draw_partners (drawn
+                here if not given)
+            stats: An EvaluationStats for each entity to record the simulation in, if given
+            worlds: A WorldBank with a world for each epoch, loaded into every world of the
+                VectorEnvironment (new worlds are generated for each epoch if not given)
+        Returns:
+            entities: The entities with their fitness updated
+        """
+
+        num_entities = len(entities)
+        weights, biases = simulating.entity.stack_parameters(entities)
+        if self.language_type == Language.EVOLVED:
+            if not isinstance(population, SignalTable):
+                population = self.signal_table(population)
+            if partners is None:
+                partners = self.draw_partners(num_entities)
+
+        envs = environment.VectorEnvironment(num_entities, self.world_width, self.world_height,
+                                             self.num_poisonous, self.num_edible, worlds is None)
+        if worlds is not None:
+            envs.load_world(worlds, 0)
+        fitness = np.zeros(num_entities, dtype=int)
+        edible_eaten = np.zeros(num_entities, dtype=int)
+        poisonous_eaten = np.zeros(num_entities, dtype=int)
+        steps = np.zeros(num_entities, dtype=int)
+        searches = np.zeros(num_entities, dtype=int)
+        exits = np.zeros((num_entities, len(EXIT_REASONS)), dtype=int)
+        saved = np.zeros((num_entities, len(EXIT_REASONS)), dtype=int)
+        worlds_index = np.arange(num_entities)
+        if self.detect_cycles:
+            visited = np.zeros((num_entities, self.world_width, self.world_height,
+                                len(environment.DIRECTIONS)), dtype=bool)
+
+        for epoch in range(self.num_epochs):
+
+            # Entities still running in this epoch, how their epoch ended, and their
+            # last four actions and states since their last meal
+            active = np.ones(num_entities, dtype=bool)
+            ending = np.full(num_entities, EXIT_REASONS.index("completed"))
+            start_steps = steps.copy()
+            previous_actions = np.zeros((num_entities, 4), dtype=int)
+            if self.detect_cycles:
+                visited.fill(False)
+
+            for step in range(self.num_cycles):
+
+                # An entity's epoch ends if it returns to a state since its last meal
+                if self.detect_cycles:
+                    state = (worlds_index, envs.positions[:, 0], envs.positions[:, 1],
+                             envs.directions)
+                    repeated = active & visited[state]
+                    ending[repeated] = EXIT_REASONS.index("detect_cycles")
+                    active &= ~repeated
+                    visited[state] |= active
+
+                # An entity's epoch ends once all of its mushrooms have been eaten
+                searches += active
+                locations, perceptions, closest = envs.observe(active)
+                ending[active & (closest == 0)] = EXIT_REASONS.index("no_mushrooms")
+                active &= closest != 0
+                rows = np.flatnonzero(active)
+                if not rows.size:
+                    break
+                steps[rows] += 1
+
+                # Get audio signals according to language type
+                if self.language_type == Language.NONE:
+                    signals = np.full((rows.size, 3), 0.5)
+                elif self.language_type == Language.EXTERNAL:
+                    edible = environment.is_edible(closest[rows])
+                    signals = np.stack([edible, ~edible, np.zeros(rows.size, dtype=bool)], axis=1)
+                else:
+                    # Each entity uses its drawn partners in turn, as in run_single, so the
+                    # partner of its nth step is its nth draw whenever its epochs end
+                    signals = population.signals(partners[rows, steps[rows] - 1],
+                                                 locations[rows], closest[rows])
+
+                # Evaluate the networks of all the active entities at once
+                inputs = make_inputs(locations[rows], perceptions[rows], signals)
+                outputs = simulating.entity.feed_forward([None] + [w[rows] for w in weights[1:]],
+                                                         [None] + [b[rows] for b in biases[1:]],
+                                                         inputs.T[:, :, np.newaxis],
+                                                         entities[0].config)
+                codes = np.zeros(num_entities, dtype=int)
+                codes[rows] = 2 * outputs[:, 0, 0] + outputs[:, 1, 0]
+
+                # Entities leave the epoch under the same conditions as in run_single
+                endings = []
+                if self.skip_none:
+                    endings.append(("skip_none", codes == Action.NOTHING.value))
+                if self.skip_facing_out:
+                    endings.append(
+                        ("skip_facing_out", (codes == Action.FORWARDS.value) & envs.facing_out()))
+                if self.detect_looping:
+                    previous_actions[:, step % 4] = codes
+                    if step > 2:
+                        turning = (codes == Action.LEFT.value) | (codes == Action.RIGHT.value)
+                        endings.append(("detect_looping", turning & (
+                            previous_actions == codes[:, np.newaxis]).all(axis=1)))
+                for reason, finished in endings:
+                    finished &= active
+                    ending[finished] = EXIT_REASONS.index(reason)
+                    active &= ~finished
+
+                # Carry out each action, eating any mushrooms reached
+                eaten = envs.step(codes, active)
+                edible = environment.is_edible(eaten) & (eaten != 0)
+                poisonous = ~environment.is_edible(eaten)
+                fitness += (edible * simulating.entity.ENERGY_EDIBLE +
+                            poisonous * simulating.entity.ENERGY_POISON)
+                edible_eaten += edible
+                poisonous_eaten += poisonous
+                if self.detect_cycles:
+                    visited[eaten != 0] = False
+
+            exits[worlds_index, ending] += 1
+            saved[worlds_index, ending] += self.num_cycles - (steps - start_steps)
+
+            # After an epoch, reset the worlds and replace the entities
+            if worlds is None:
+                envs.reset()
+            elif epoch + 1 < self.num_epochs:
+                envs.load_world(worlds, epoch + 1)
+
+        for entity, energy in zip(entities, fitness.tolist()):
+            entity.fitness += energy
+        if stats is not None:
+            for i, record in enumerate(stats):
+                record.fitness += int(fitness[i])
+                record.edible += int(edible_eaten[i])
+                record.poisonous += int(poisonous_eaten[i])
+                record.steps += int(steps[i])
+                record.passes += int(steps[i])
+                record.searches += int(searches[i])
+                record.exits = [
+                    total + count for total, count in zip(record.exits, exits[i].tolist())
+                ]
+                record.saved = [
+                    total + count for total, count in zip(record.saved, saved[i].tolist())
+                ]
+
+        return entities
+
     def get_signal(self, angle, mush, population, viewer):
         """
         Generate the appropriate audio signal according to language type
@@ -240,7 +713,7 @@ class Simulation:  #pylint: disable=R0903
         Args:
             angle: The angle to the closest mushroom
             mush: The perceptual properties of the closest mushroom
-            population: The remaining entities in the population
+            population: The remaining entities in the population, or their SignalTable
             viewer (bool): If true, prints debugging information and pauses        
         """
 
@@ -255,32 +728,47 @@ class Simulation:  #pylint: disable=R0903
 
         elif self.language_type == Language.EVOLVED:
             # A partner entity (which can see the mushroom properties)
-            # names the mushroom for this entity
-            partner_entity = random.choice(population)
-            _, signal = partner_entity.behaviour(angle, mush, [0.5, 0.5, 0.5])
-            if viewer:
-                print("Partner vocal:", signal)
-                print("Partner weights:", partner_entity.weights)
-                print("Partner weights:", partner_entity.biases)
+            # names the mushroom for this entity, looked up if given a signal table
+            if isinstance(population, SignalTable):
+                signal = population.signal(angle, mush)
+                if viewer:
+                    print("Partner vocal:", signal)
+            else:
+                partner_entity = random.choice(population)
+                _, signal = partner_entity.behaviour(angle, mush, [0.5, 0.5, 0.5])
+                if viewer:
+                    print("Partner vocal:", signal)
+                    print("Partner weights:", partner_entity.weights)
+                    print("Partner weights:", partner_entity.biases)
 
         return signal
 
-    def start(self, hidden_units=[5]):
+    def start(self, config=None):
         """ Run a population of neural entities from generation 0
+
+        Args:
+            config: The NetworkConfig of the population, or a list of the number of units
+                in each hidden layer (from the module defaults if not given)
         """
 
-        # Generate an initial population of neural entities
-        entities = [NeuralEntity(0, hidden_units) for _ in range(self.num_entities)]
+        # Generate an initial population of neural entities, all sharing one configuration
+        if config is None:
+            config = default_config()
+        elif not isinstance(config, NetworkConfig):
+            config = default_config(config)
+        entities = [NeuralEntity(config=config) for _ in range(self.num_entities)]
         self.run_population(entities)
 
-    def start_from_generation(self, generation):
+    def start_from_generation(self, generation, config=None):
         """ Run a previously-saved population of neural entities
 
         Args:
             generation: The generation to load from
+            config: The NetworkConfig whose activation, linearity and parameter type to
+                give the population, if not the ones it was saved with
         """
 
-        entities = self.load_entities(generation)
+        entities = self.load_entities(generation, config)
         self.run_population(entities, generation)
 
     def run_population(self, entities, start_generation=0):
@@ -293,62 +781,151 @@ class Simulation:  #pylint: disable=R0903
         """
 
         # Initialise files and plotter for simulation I/O
-        plotter = self.initialise_io()
+        plotter = self.initialise_io(entities[0].config)
         start_time = time.time()
-        gen_time = time.time()
-
-        # Run evolution loop
-        for generation in range(start_generation, self.num_generations + 1):
 
-            # For each entity, create a list of the other entities for the Evolved language
-            cloned_population = [ent.copy() for ent in entities]
-            populations = [[] for i in range(len(cloned_population))]
+        # Create the worker processes and the shared population once for the whole run,
+        # with room for the starting population and every reproduced population
+        pool = shared = None
+        if self.threading and not self.lockstep:
+            capacity = max(len(entities),
+                           math.ceil(self.num_entities * self.percentage_keep) *
+                           int(1 / self.percentage_keep))
+            num_draws = 0
             if self.language_type == Language.EVOLVED:
-                for i in range(len(cloned_population)):
-                    populations[i] = (cloned_population[0:i] +
-                                      cloned_population[i + 1:len(cloned_population)])
-
-            # Run a simulation for each entity
-            if self.threading:
-                with Pool() as pool:
-                    entities = pool.starmap(self.run_single, zip(entities, populations))
-            else:
-                for i, entity in enumerate(entities):
-                    self.run_single(entity, populations[i])
+                num_draws = self.num_epochs * self.num_cycles
+            shared = parallel.SharedPopulation(entities[0].config, capacity, num_draws=num_draws)
+            pool = parallel.make_pool(self, entities[0].config, shared)
+        try:
+            self.run_generations(entities, start_generation, plotter, pool, shared)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                shared.close(unlink=True)
+
+        # Save simulation time
+        with open(self.foldername + "/info.txt", "a") as info_file:
+            info_file.writelines("\nTime taken: {} minutes".format(
+                round((time.time() - start_time) / 60, 5)))
+
+    def run_generations(  #pylint: disable=R0913
+            self, entities, start_generation, plotter, pool=None, shared=None):
+        """ Run the evolution loop of run_population
+
+        Args:
+            entities: The population at the starting generation
+            start_generation: The generation to start from
+            plotter: The plotter of the average fitness, if interactive
+            pool: The pool of worker processes, if running in parallel
+            shared: The shared population evaluated by the pool
+        """
 
-            # Sort the entities by final fitness value
-            entities.sort(key=lambda entity: entity.fitness, reverse=True)
+        for generation in range(start_generation, self.num_generations + 1):
+            times = PhaseTimes()
+
+            # For the Evolved language, create the table of the signal each entity
+            # gives as a partner and draw the partners of each entity
+            table = self.signal_table(entities)
+            partners = None
+            if table is not None:
+                partners = self.draw_partners(len(entities), generation)
+
+            # With shared worlds, every entity is run in one bank of worlds for the generation
+            world_seed = worlds = None
+            if self.shared_worlds:
+                world_seed = self.world_seed(generation)
+                worlds = self.make_world_bank(world_seed)
+
+            # When deduplicating, only the first entity with each behaviour needs to be run
+            indices = list(range(len(entities)))
+            if self.deduplicate:
+                representatives, classes = self.behaviour_classes(entities)
+                indices = representatives.tolist()
+            times.lap("preparation")
+
+            # Run a simulation for each entity, recording the statistics of each
+            if self.lockstep:
+                stats = [EvaluationStats() for _ in indices]
+                self.run_lockstep([entities[i] for i in indices], table, partners, stats, worlds)
+            elif pool is not None:
+                # Workers only send back the statistics, joined to the entities by index
+                shared.publish(entities, partners)
+                times.lap("publishing")
+                stats = pool.starmap(parallel.evaluate,
+                                     [(i, len(entities), generation, world_seed) for i in indices])
+                for i, record in zip(indices, stats):
+                    entities[i].fitness += record.fitness
+            else:
+                stats = [EvaluationStats() for _ in indices]
+                for i, record in zip(indices, stats):
+                    self.run_single(entities[i], self.partners_of(i, table, partners),
+                                    stats=record, worlds=worlds)
+
+            # Total the work of the simulations actually run, and of grouping the entities
+            work = combine(stats)
+            if self.deduplicate:
+                work.passes += len(entities) * len(self.observations()) * len(self.listenings())
+
+            # Give every entity the statistics of the entity run for its behaviour
+            if self.deduplicate:
+                stats = [stats[group].copy() for group in classes]
+                for i in np.setdiff1d(np.arange(len(entities)), representatives):
+                    entities[i].fitness += stats[i].fitness
+            times.lap("evaluation")
+
+            # Sort the entities by final fitness value, keeping the partners and statistics of each
+            # (a stable sort, so entities with equal fitness keep their order)
+            ranking = np.argsort([-entity.fitness for entity in entities], kind="stable")
+            entities = [entities[i] for i in ranking]
+            populations = [self.partners_of(i, table) for i in ranking]
+            stats = [stats[i] for i in ranking]
+            times.lap("sorting")
 
             # Do I/O including writing to files and displaying interactive information
-            self.io(generation, entities, populations, time.time() - gen_time, plotter)
-            gen_time = time.time()
+            self.io(generation, entities, populations, times, plotter, pool, stats, work,
+                    len(indices))
 
             # Finally, select the best entities to reproduce for the next generation
             entities = self.reproduce_population(entities)
+            times.lap("reproduction")
 
-        # Save simulation time
-        with open(self.foldername + "/info.txt", "a") as info_file:
-            info_file.writelines("\nTime taken: {} minutes".format(
-                round((time.time() - start_time) / 60, 5)))
+            # Log the time spent in each phase of the generation
+            if self.record_time:
+                with open(self.foldername + "/time.txt", "a") as time_file:
+                    time_file.write(" ".join(str(value)
+                                             for value in [generation] + times.row()) + "\n")
 
     def reproduce_population(self, entities):
         """
         Use percentage_keep and percentage_mutate to create
         a new population of entities using asexual reproduction
+
+        The genomes of the population are stacked into a matrix, and the genomes of
+        the new population are produced from it by the genetic module, so the order
+        of the entities only matters to break ties in fitness.
         """
-        best_entities = entities[:math.ceil(self.num_entities * self.percentage_keep)]
-        new_population = [
-            child for entity in best_entities
-            for child in entity.reproduce(int(1 / self.percentage_keep), self.percentage_mutate)
-        ]
-        return new_population
+        genomes = np.stack([entity.genome for entity in entities])
+        fitness = np.array([entity.fitness for entity in entities])
+        children = genetic.reproduce(genomes, fitness,
+                                     math.ceil(self.num_entities * self.percentage_keep),
+                                     int(1 / self.percentage_keep), self.percentage_mutate)
+        return [NeuralEntity(0, genome=genome, config=entities[0].config) for genome in children]
 
     skip_interactive_count = 0
 
-    def initialise_io(self):
+    def initialise_io(self, config=None):
         """ Create the neccessary plotter and folders for I/O
+
+        Args:
+            config: The NetworkConfig of the population, recorded in info.txt
         """
-        plotter = Plotter() if self.interactive else None
+        if config is None:
+            config = default_config()
+        plotter = None
+        if self.interactive:
+            # Only import the plotter (and matplotlib) when it is needed
+            from analysis.plotting import Plotter  #pylint: disable=C0415
+            plotter = Plotter()
         if not os.path.exists(self.foldername):
             os.makedirs(self.foldername)
         if not os.path.exists(self.foldername + "/populations"):
@@ -357,28 +934,52 @@ class Simulation:  #pylint: disable=R0903
             fitness_file = self.foldername + "/fitness.txt"
             open(fitness_file, "w").close()
         if self.record_time:
-            fitness_file = self.foldername + "/time.txt"
-            open(fitness_file, "w").close()
+            with open(self.foldername + "/time.txt", "w") as time_file:
+                time_file.write(" ".join(["generation"] + PHASES + ["total"]) + "\n")
+        if self.record_metrics:
+            with open(self.foldername + "/metrics.txt", "w") as metrics_file:
+                metrics_file.write(" ".join(["generation", "entities", "evaluated", "cycles"] +
+                                            METRICS) + "\n")
         if not os.path.exists(self.foldername + "/info.txt"):
             info_file = open(self.foldername + "/info.txt", "w")
             info_file.writelines("\n".join([
                 "Num Epochs: " + str(self.num_epochs), "Num Cycles: " + str(self.num_cycles),
                 "Num Entities: " + str(self.num_entities),
                 "Num Generations:" + str(self.num_generations),
+                "World Size: {}x{}".format(self.world_width, self.world_height),
+                "Num Edible: " + str(self.num_edible),
+                "Num Poisonous: " + str(self.num_poisonous),
+                "Environment: " + self.environment_type,
                 "Language Type: " + str(self.language_type),
                 "Percentage Mutate: " + str(self.percentage_mutate),
                 "Percentage Keep: " + str(self.percentage_keep),
-                "Linear: " + str(simulating.entity.LINEAR),
-                "Activation function: " + str(simulating.entity.ACTIVATION),
-                "Optimisation: " + self.optimisation
+                "Linear: " + str(config.linear),
+                "Activation function: " + str(config.activation),
+                "Hidden units: " + ",".join(str(units) for units in config.hidden_units),
+                "Parameter type: " + config.dtype.name,
+                "Optimisation: " + self.optimisation,
+                "Seed: " + str(self.seed)
             ]))
             info_file.close()
 
         return plotter
 
-    def io(self, generation, entities, populations, gen_time, plotter):
+    def io(  #pylint: disable=R0913
+            self, generation, entities, populations, times, plotter, pool=None, stats=None,
+            work=None, evaluated=None):
         """ Write to files and display the plotter and interactive information
-        for the simulation
+        for the simulation, charging the time of each part to the PhaseTimes given
+
+        The metrics of a generation are the totals of the fitness and mushrooms eaten
+        of its entities, then the counters of the work done. Only the entities actually
+        simulated (fewer than the population when deduplicating) did any work, so the
+        work, exits and skipped cycles are totalled over those, with the cycles
+        budgeted for them.
+
+        Args:
+            work: The total EvaluationStats of the simulations actually run (all of stats
+                if not given)
+            evaluated: The number of entities actually simulated
         """
         # Get average fitness
         average_fitness = sum([entity.fitness for entity in entities]) / len(entities)
@@ -388,26 +989,35 @@ class Simulation:  #pylint: disable=R0903
             with open(self.foldername + "/fitness.txt", "a") as out:
                 out.write(str(average_fitness) + "\n")
 
+        # Save the totals of the statistics of the generation
+        if self.record_metrics and stats:
+            evaluated = len(entities) if evaluated is None else evaluated
+            row = [generation, len(entities), evaluated,
+                   evaluated * self.num_epochs * self.num_cycles] + combine(stats).metrics(work)
+            with open(self.foldername + "/metrics.txt", "a") as out:
+                out.write(" ".join(str(value) for value in row) + "\n")
+        times.lap("files")
+
         # If generation is a multiple of the record_language_period
         # option, record the language
         if self.record_language and generation % self.record_language_period == 0:
-            self.save_language(entities, generation)
+            self.save_language(entities, generation, pool)
+        times.lap("language")
 
         # If generation is a multiple of the save_entities_period
         # option, save the population
         if self.record_entities and generation % self.record_entities_period == 0:
             self.save_entities(entities, generation)
+        times.lap("entities")
 
         # Run interactive menu and plot the average fitness over time
         if self.interactive:
             plotter.add_point_and_update(generation, average_fitness)
-            self.interactive_viewer(generation, entities, populations, average_fitness)
-
-        # Log time
-        with open(self.foldername + "/time.txt", "a") as time_file:
-            time_file.write(str(gen_time) + "\n")
+            self.interactive_viewer(generation, entities, populations, average_fitness, stats)
+        times.lap("interactive")
 
-    def interactive_viewer(self, generation, entities, populations, average_fitness):
+    def interactive_viewer(  #pylint: disable=R0913
+            self, generation, entities, populations, average_fitness, stats=None):
         """ At each generation, display information about the simulation
 
         Loops to allow for viewing individual entities' behaviour, 
@@ -415,6 +1025,7 @@ class Simulation:  #pylint: disable=R0903
         Args:
             generation: The current generation
             entities: The list of entities at this generation
+            stats: The EvaluationStats of each entity at this generation
         """
 
         loop_interactive = True
@@ -423,6 +1034,10 @@ class Simulation:  #pylint: disable=R0903
             print("Sorted fitness values: ")
             print([entity.fitness for entity in entities])
             print("Average fitness:", average_fitness)
+            if stats:
+                print("Average mushrooms eaten: {} edible, {} poisonous".format(
+                    sum(record.edible for record in stats) / len(stats),
+                    sum(record.poisonous for record in stats) / len(stats)))
             if self.skip_interactive_count > 0:
                 self.skip_interactive_count -= 1
                 usr_input = ""
@@ -455,17 +1070,21 @@ class Simulation:  #pylint: disable=R0903
             else:
                 print("INVALID INPUT\n")
 
-    def save_language(self, entities, generation):
+    def save_language(self, entities, generation, pool=None):
         """
         Given a group of entities at a certain generation, performs a naming task
         for each entity to get a sample of the language used by the entities
-        for edible and poisonous mushrooms
+        for edible and poisonous mushrooms, using the pool of workers if given
         """
 
+        if pool is not None:
+            samples = pool.map(parallel.naming_task, entities)
+        else:
+            samples = [self.naming_task(entity) for entity in entities]
+
         edible_samples = []
         poisonous_samples = []
-        for entity in entities:
-            edible, poisonous = self.naming_task(entity)
+        for edible, poisonous in samples:
             edible_samples.extend(edible)
             poisonous_samples.extend(poisonous)
 
@@ -494,15 +1113,35 @@ class Simulation:  #pylint: disable=R0903
 
         pickle.dump([entity.copy() for entity in entities], open(filename, 'wb'))
 
-    def load_entities(self, generation):
+    def load_entities(self, generation, config=None):
         """
         Load a group of entities from a file
+
+        Args:
+            generation: The generation to load
+            config: The NetworkConfig whose activation, linearity and parameter type to
+                give the population, if not the ones it was saved with
+        Raises:
+            ValueError: A saved genome does not fit the network it was saved with
         """
 
         filename = self.foldername + "/populations/generation" + str(generation) + ".p"
 
         entities = pickle.load(open(filename, "rb"))
         entities = [entity.copy() for entity in entities]
+
+        # Give every entity the same configuration, keeping the saved network shape
+        # and converting the parameters to the type of the configuration
+        saved = entities[0].config
+        if config is None:
+            config = saved
+        config = NetworkConfig(config.activation, config.linear, saved.hidden_units, config.dtype)
+        size = genome_size(config.layers_units)
+        for entity in entities:
+            if entity.genome.size != size:
+                raise ValueError("Saved genome of {} parameters does not fit a network of {} "
+                                 "units".format(entity.genome.size, config.layers_units))
+            entity.set_genome(entity.genome.astype(config.dtype, copy=False), config)
         return entities
 
     def naming_task(self, entity):
@@ -511,41 +1150,57 @@ class Simulation:  #pylint: disable=R0903
         for poisonous and edible mushrooms
         """
 
-        edible_samples = []
-        poisonous_samples = []
-
         # Get all possible mushrooms
         edible_mushrooms = [environment.make_edible(i) for i in range(10)]
         poisonous_mushrooms = [environment.make_poisonous(i) for i in range(10)]
-
-        # Get a sample of the language for each mushroom for each of four directions
-        for angle in [0, 0.25, 0.5, 0.75]:
-            for mushroom in edible_mushrooms:
-                _, signal = entity.behaviour(angle, mushroom, [0.5, 0.5, 0.5])
-                edible_samples.append(array_to_bits(signal))
-            for mushroom in poisonous_mushrooms:
-                _, signal = entity.behaviour(angle, mushroom, [0.5, 0.5, 0.5])
-                poisonous_samples.append(array_to_bits(signal))
+        mushrooms = edible_mushrooms + poisonous_mushrooms
+
+        # Get a sample of the language for each mushroom for each of four directions,
+        # evaluating all 80 samples in one batch
+        angles = [0, 0.25, 0.5, 0.75]
+        inputs = make_inputs([angle for angle in angles for _ in mushrooms],
+                             mushrooms * len(angles),
+                             [[0.5, 0.5, 0.5]] * (len(angles) * len(mushrooms)))
+        _, vocals = entity.batch_behaviour(inputs)
+        samples = vocals.dot([4, 2, 1]).reshape(len(angles), 2, 10)
+        edible_samples = samples[:, 0].flatten().tolist()
+        poisonous_samples = samples[:, 1].flatten().tolist()
 
         # Return samples
         return edible_samples, poisonous_samples
 
 
+def optimisation_type(value):
+    """ Checks the comma-separated list of optimisations given to -O
+    """
+
+    for mode in value.split(","):
+        if mode not in OPTIMISATIONS:
+            raise argparse.ArgumentTypeError("invalid optimisation: '{}'".format(mode))
+    return value
+
+
 def run_single():
     """ Run a simulation for one entity
     """
 
     sim = Simulation(args.num_epo, args.num_cyc, args.num_ent, args.num_gen, args.language,
-                     args.per_mut, args.per_keep, args.O)
+                     args.per_mut, args.per_keep, args.O, args.seed)
     sim.set_io_options(interactive=args.interactive,
                        record_language=args.rec_lang,
                        record_language_period=args.rec_lang_per,
                        record_entities=args.rec_ent,
                        record_entities_period=args.rec_ent_per,
                        record_fitness=args.rec_fit,
-                       record_time=args.rec_time,
+                       record_time=args.no_rec_time,
                        foldername=args.foldername)
-    ent = NeuralEntity(hidden_units=args.hidden_units)
+    sim.set_world_options(width=args.width,
+                          height=args.height,
+                          edible=args.num_edible,
+                          poisonous=args.num_poisonous,
+                          environment_type=args.environment,
+                          spatial_index=args.spatial_index)
+    ent = NeuralEntity(config=args.network)
     sim.run_single(ent, viewer=True)
 
 
@@ -554,16 +1209,23 @@ def run_full():
     """
 
     sim = Simulation(args.num_epo, args.num_cyc, args.num_ent, args.num_gen, args.language,
-                     args.per_mut, args.per_keep, args.O)
+                     args.per_mut, args.per_keep, args.O, args.seed)
     sim.set_io_options(interactive=args.interactive,
                        record_language=args.no_rec_lang,
                        record_language_period=args.rec_lang_per,
                        record_entities=args.no_rec_ent,
                        record_entities_period=args.rec_ent_per,
                        record_fitness=args.no_rec_fit,
-                       record_time=args.rec_time,
-                       foldername=args.foldername)
-    sim.start(args.hidden_units)
+                       record_time=args.no_rec_time,
+                       foldername=args.foldername,
+                       record_metrics=args.no_rec_metrics)
+    sim.set_world_options(width=args.width,
+                          height=args.height,
+                          edible=args.num_edible,
+                          poisonous=args.num_poisonous,
+                          environment_type=args.environment,
+                          spatial_index=args.spatial_index)
+    sim.start(args.network)
 
 
 def run_from_generation():
@@ -573,7 +1235,7 @@ def run_from_generation():
     """
 
     sim = Simulation(args.num_epo, args.num_cyc, args.num_ent, args.num_gen, args.language,
-                     args.per_mut, args.per_keep, args.O)
+                     args.per_mut, args.per_keep, args.O, args.seed)
     sim.set_io_options(interactive=args.interactive,
                        record_language=False,
                        record_language_period=0,
@@ -581,8 +1243,15 @@ def run_from_generation():
                        record_entities_period=0,
                        record_fitness=False,
                        record_time=False,
-                       foldername=args.foldername)
-    sim.start_from_generation(args.start_from)
+                       foldername=args.foldername,
+                       record_metrics=False)
+    sim.set_world_options(width=args.width,
+                          height=args.height,
+                          edible=args.num_edible,
+                          poisonous=args.num_poisonous,
+                          environment_type=args.environment,
+                          spatial_index=args.spatial_index)
+    sim.start_from_generation(args.start_from, args.network)
 
 
 if __name__ == '__main__':
@@ -627,6 +1296,37 @@ if __name__ == '__main__':
                         type=float,
                         default=0.2,
                         help='percentage of population that reproduces')
+    parser.add_argument('--width',
+                        action='store',
+                        type=int,
+                        default=20,
+                        help='width of the world')
+    parser.add_argument('--height',
+                        action='store',
+                        type=int,
+                        default=20,
+                        help='height of the world')
+    parser.add_argument('--num_edible',
+                        action='store',
+                        type=int,
+                        default=10,
+                        help='number of edible mushrooms in the world')
+    parser.add_argument('--num_poisonous',
+                        action='store',
+                        type=int,
+                        default=10,
+                        help='number of poisonous mushrooms in the world')
+    parser.add_argument('--environment',
+                        action='store',
+                        default='dict',
+                        choices=list(environment.ENVIRONMENTS),
+                        help='how the world is stored')
+    parser.add_argument('--spatial_index',
+                        action='store',
+                        default=None,
+                        choices=list(environment.SPATIAL_INDEXES),
+                        help='how the closest mushroom is found (defaults to scan for the '
+                        'dict environment and map for the grid environment)')
     parser.add_argument('--no_rec_lang', action='store_false', help='don\'t store the language')
     parser.add_argument('--rec_lang_per',
                         action='store',
@@ -640,9 +1340,12 @@ if __name__ == '__main__':
                         default=25,
                         help='how frequently to store the population')
     parser.add_argument('--no_rec_fit', action='store_false', help='don\'t store the fitness')
-    parser.add_argument('--rec_time',
-                        action='store_true',
-                        help='store the time taken for each generation')
+    parser.add_argument('--no_rec_time',
+                        action='store_false',
+                        help='don\'t store the time taken by each phase of each generation')
+    parser.add_argument('--no_rec_metrics',
+                        action='store_false',
+                        help='don\'t store the counters of each generation')
     parser.add_argument('--activation',
                         action='store',
                         default='identity',
@@ -651,6 +1354,9 @@ if __name__ == '__main__':
     parser.add_argument('--linear',
                         action='store_true',
                         help='don\'t use an activation on the final layer')
+    parser.add_argument('--float32',
+                        action='store_true',
+                        help='store the network parameters as 32-bit floats')
     parser.add_argument('--hidden_units',
                         action='store',
                         default='5',
@@ -660,22 +1366,28 @@ if __name__ == '__main__':
                         type=int,
                         default=0,
                         help='generation to start the simulation from')
-    parser.add_argument(
-        '-O',
-        action='store',
-        default='all',
-        choices=['none', 'parallel', 'skip_none', 'skip_facing_out', 'detect_looping', 'all'],
-        help='optimisations to the simulation')
+    parser.add_argument('--seed',
+                        action='store',
+                        type=int,
+                        default=None,
+                        help='seed for the partners drawn for the evolved language and the '
+                        'worlds shared by each generation')
+    parser.add_argument('-O',
+                        action='store',
+                        type=optimisation_type,
+                        default='all',
+                        help='comma-separated optimisations to the simulation, from: ' +
+                        ', '.join(OPTIMISATIONS))
 
     args, unknown = parser.parse_known_args()
 
-    # Set the activation function
-    simulating.entity.ACTIVATION = args.activation
-    simulating.entity.LINEAR = args.linear
-
     # Parse hidden units
     args.hidden_units = [int(x) for x in args.hidden_units.split(',')]
 
+    # Set the configuration of the neural networks
+    args.network = NetworkConfig(args.activation, args.linear, args.hidden_units,
+                                 np.float32 if args.float32 else np.float64)
+
     if args.single:
         run_single()
     elif not args.start_from == 0:
@@ -0,0 +1,178 @@
+"""
+This module holds the statistics recorded while evaluating an entity, and the
+time spent in each phase of a generation.
+
+A record is small, so it is what parallel workers send back to the main
+process instead of the entity itself.
+"""
+
+import time
+
+from simulating import environment
+
+# The ways an epoch can end: running every cycle, eating every mushroom,
+# or being skipped by one of the optimisations
+EXIT_REASONS = [
+    "completed", "no_mushrooms", "skip_none", "skip_facing_out", "detect_looping", "detect_cycles"
+]
+
+# The counts of a record, split into the outcome of a simulation and the work done
+# to run it, then the metrics recorded for each generation
+OUTCOMES = ["fitness", "edible", "poisonous"]
+WORK = ["steps", "passes", "searches"]
+COUNTERS = OUTCOMES + WORK
+METRICS = (COUNTERS + ["exits_" + reason for reason in EXIT_REASONS] +
+           ["saved_" + reason for reason in EXIT_REASONS])
+
+# The phases of a generation, in the order they are run
+PHASES = [
+    "preparation", "publishing", "evaluation", "sorting", "files", "language", "entities",
+    "interactive", "reproduction"
+]
+
+
+class EvaluationStats:
+    """ Statistics of a single simulation of one entity
+
+    Attributes:
+        fitness: The fitness gained in the simulation
+        edible: The number of edible mushrooms eaten
+        poisonous: The number of poisonous mushrooms eaten
+        steps: The number of cycles the entity chose an action in
+        passes: The number of inputs the network of the entity was evaluated on, including
+            those compiled into a BehaviourTable but not the lookups in it
+        searches: The number of searches for the closest mushroom
+        exits: The number of epochs ending for each reason in EXIT_REASONS
+        saved: The number of cycles skipped by epochs ending for each reason in EXIT_REASONS
+    """
+
+    __slots__ = ["fitness", "edible", "poisonous", "steps", "passes", "searches", "exits", "saved"]
+
+    def __init__(  #pylint: disable=R0913
+            self, fitness=0, edible=0, poisonous=0, steps=0, exits=None, saved=None, passes=0,
+            searches=0):
+        self.fitness = fitness
+        self.edible = edible
+        self.poisonous = poisonous
+        self.steps = steps
+        self.passes = passes
+        self.searches = searches
+        self.exits = [0] * len(EXIT_REASONS) if exits is None else exits
+        self.saved = [0] * len(EXIT_REASONS) if saved is None else saved
+
+    def __repr__(self):
+        return ("EvaluationStats(fitness={}, edible={}, poisonous={}, steps={}, exits={}, "
+                "saved={}, passes={}, searches={})").format(self.fitness, self.edible,
+                                                            self.poisonous, self.steps, self.exits,
+                                                            self.saved, self.passes, self.searches)
+
+    def __eq__(self, other):
+        return isinstance(other, EvaluationStats) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def copy(self):
+        """ Returns a copy of these statistics """
+
+        return EvaluationStats(self.fitness, self.edible, self.poisonous, self.steps,
+                               list(self.exits), list(self.saved), self.passes, self.searches)
+
+    def add(self, other):
+        """ Adds the counts of another record to this one """
+
+        for name in COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.exits = [total + count for total, count in zip(self.exits, other.exits)]
+        self.saved = [total + count for total, count in zip(self.saved, other.saved)]
+
+    def metrics(self, work=None):
+        """ Returns the value of each of METRICS
+
+        Args:
+            work: The record to take the work counters, exits and skipped cycles from,
+                if not this one
+        """
+
+        if work is None:
+            work = self
+        return ([getattr(self, name) for name in OUTCOMES] +
+                [getattr(work, name) for name in WORK] + work.exits + work.saved)
+
+    def eat(self, mushroom):
+        """ Record a mushroom being eaten """
+
+        if environment.is_edible(mushroom):
+            self.edible += 1
+        elif environment.is_poisonous(mushroom):
+            self.poisonous += 1
+
+    def end_epoch(self, reason, saved=0):
+        """ Record an epoch ending for a reason in EXIT_REASONS
+
+        Args:
+            reason: The reason the epoch ended
+            saved: The number of cycles of the epoch that were skipped
+        """
+
+        self.exits[EXIT_REASONS.index(reason)] += 1
+        self.saved[EXIT_REASONS.index(reason)] += saved
+
+    def exit_counts(self):
+        """ Returns a dictionary from each exit reason to its number of epochs """
+
+        return dict(zip(EXIT_REASONS, self.exits))
+
+    def saved_counts(self):
+        """ Returns a dictionary from each exit reason to the number of cycles it skipped """
+
+        return dict(zip(EXIT_REASONS, self.saved))
+
+
+def combine(records):
+    """ Returns the total of a list of EvaluationStats """
+
+    total = EvaluationStats()
+    for record in records:
+        total.add(record)
+    return total
+
+
+class PhaseTimes:
+    """ The wall-clock time spent in each phase of a generation
+
+    Each call to lap charges the time since the previous lap, or since the
+    record was created, to a phase.
+
+    Attributes:
+        times: Dictionary from each phase in PHASES to its time in seconds
+        last: The performance counter at the previous lap
+    """
+
+    __slots__ = ["times", "last"]
+
+    def __init__(self):
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        """ Charge the time since the previous lap to a phase in PHASES """
+
+        now = time.perf_counter()
+        self.times[phase] += now - self.last
+        self.last = now
+
+    def total(self):
+        """ Returns the time spent in every phase """
+
+        return sum(self.times.values())
+
+    def row(self):
+        """ Returns the time of each of PHASES followed by the total """
+
+        return [self.times[phase] for phase in PHASES] + [self.total()]
@@ -0,0 +1,31 @@
+"""
+This module holds the fixtures shared by the tests
+"""
+
+import pytest
+
+from simulating import environment
+
+
+class MirroredVectorEnvironment(environment.VectorEnvironment):
+    """ A VectorEnvironment whose worlds are generated in the same way as run_single's """
+    def reset(self):
+        if not hasattr(self, "envs"):
+            self.envs = [environment.Environment(self.dim_x, self.dim_y, self.num_poisonous,
+                                                 self.num_edible)
+                         for _ in range(self.num_worlds)]
+        else:
+            for env in self.envs:
+                env.reset()
+        for i, env in enumerate(self.envs):
+            env.place_entity()
+            self.load(i, env)
+
+
+@pytest.fixture
+def mirrored_worlds(monkeypatch):
+    """
+    Makes the lockstep engine generate its worlds from the same random draws as run_single
+    """
+
+    monkeypatch.setattr(environment, "VectorEnvironment", MirroredVectorEnvironment)
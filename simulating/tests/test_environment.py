@@ -2,12 +2,17 @@
 This module runs all the tests for the Environment class
 """
 
+import random
+import sys
+
+import numpy as np
 import pytest
 
 from simulating import environment
 from simulating.action import Action
 from simulating.environment import Direction
 from simulating.environment import Environment
+from simulating.environment import GridEnvironment
 from simulating.environment import MushroomNotFound
 from simulating.environment import WorldFull
 
@@ -93,6 +98,80 @@ def test_closest_mushroom_returns_in_bounds():
     assert env.within_bounds(pos)
 
 
+def test_closest_mushroom_ties_placement_order():
+    """
+    Check that the first mushroom placed wins a tie for the closest mushroom
+    """
+
+    for spatial_index in environment.SPATIAL_INDEXES:
+        env = Environment(10, 10, 0, 0, spatial_index=spatial_index)
+        env.add_mushroom((7, 5), 0b1111100000)
+        env.add_mushroom((3, 5), 0b1111100000)
+        env.add_mushroom((5, 8), 0b1111100000)
+        assert env.closest_mushroom((5, 5)) == (7, 5)
+        env.clear_cell((7, 5))
+        assert env.closest_mushroom((5, 5)) == (3, 5)
+        env.add_mushroom((7, 5), 0b1111100000)
+        assert env.closest_mushroom((5, 5)) == (3, 5)
+
+
+def test_spatial_indexes_match_scan():
+    """
+    Check that the grid and map indexes find the same closest mushroom as scanning
+    the world as mushrooms are eaten and placed
+    """
+
+    indexes = [
+        lambda env: environment.GridIndex(env),
+        lambda env: environment.GridIndex(env, 1),
+        lambda env: environment.GridIndex(env, 3),
+        environment.MapIndex,
+    ]
+    for make_index in indexes:
+        env = Environment(30, 20, 20, 20)
+        indexed_env = Environment(30, 20, 0, 0)
+        indexed_env.index = make_index(indexed_env)
+        indexed_env.reset()
+        for pos, mushroom in env.world.items():
+            indexed_env.add_mushroom(pos, mushroom)
+        for i in range(60):
+            pos = env.random_position()
+            mush_pos = env.closest_mushroom(pos)
+            assert indexed_env.closest_mushroom(pos) == mush_pos
+            env.clear_cell(mush_pos)
+            indexed_env.clear_cell(mush_pos)
+            if i % 2 == 0:
+                new_pos = env.random_available_position()
+                env.add_mushroom(new_pos, 0b1111100000)
+                indexed_env.add_mushroom(new_pos, 0b1111100000)
+
+
+def test_spatial_index_no_mushrooms():
+    """
+    Check that an exception is thrown by each index if no mushrooms are in the world
+    """
+
+    for spatial_index in environment.SPATIAL_INDEXES:
+        env = Environment(10, 10, 1, 0, spatial_index=spatial_index)
+        env.clear_cell(env.closest_mushroom((5, 5)))
+        with pytest.raises(MushroomNotFound):
+            env.closest_mushroom((5, 5))
+
+
+def test_map_index_distance_transform():
+    """
+    Check that the map built after a reset holds the distance to the closest
+    mushroom from every cell
+    """
+
+    env = Environment(15, 12, 5, 5, spatial_index="map")
+    env.closest_mushroom((0, 0))
+    for x in range(15):
+        for y in range(12):
+            distance = min(abs(x - i) + abs(y - j) for (i, j) in env.world)
+            assert env.index.keys[x, y] // environment.MapIndex.DISTANCE == distance
+
+
 def test_is_mushroom():
     """
     Check that the world returns whether or not a mushroom is in a position
@@ -290,6 +369,61 @@ def test_get_entity_angle_to_position():
     assert env.get_entity_angle_to_position((0, 0)) == 0.875
 
 
+def test_angle_table_matches_get_angle():
+    """
+    Tests that the precomputed angles equal the computed angles for every pair of positions
+    """
+
+    env = Environment(6, 4, 0, 0)
+    for direction in Direction:
+        env.entity_direction = direction
+        for x1 in range(6):
+            for y1 in range(4):
+                env.entity_position = (x1, y1)
+                for x2 in range(6):
+                    for y2 in range(4):
+                        assert (env.get_entity_angle_to_position(
+                            (x2, y2)) == env.get_angle((x1, y1), (x2, y2), direction))
+
+
+def test_angle_table_cached():
+    """
+    Tests that worlds of the same size share an angle table
+    """
+
+    assert Environment(7, 3, 0, 0).angles is Environment(7, 3, 1, 1).angles
+    assert environment.angle_table(7, 3) is not environment.angle_table(3, 7)
+
+
+def test_reachable_angles():
+    """
+    Tests that the reachable angles include every angle to a position in the world
+    """
+
+    env = Environment(5, 4, 0, 0)
+    angles = env.reachable_angles()
+    assert angles == sorted(set(angles))
+    for direction in Direction:
+        env.entity_direction = direction
+        for x1 in range(5):
+            for y1 in range(4):
+                env.entity_position = (x1, y1)
+                for x2 in range(5):
+                    for y2 in range(4):
+                        assert env.get_entity_angle_to_position((x2, y2)) in angles
+    assert env.reachable_angles(1) == [i / 8 for i in range(8)]
+
+
+def test_all_mushrooms():
+    """
+    Tests that all the different mushrooms are returned
+    """
+
+    mushrooms = environment.all_mushrooms()
+    assert len(set(mushrooms)) == 20
+    assert len([mush for mush in mushrooms if environment.is_edible(mush)]) == 10
+
+
 def test_get_cell_empty():
     """
     Test that 0 is returned if cell empty
@@ -370,3 +504,156 @@ def test_repeated_mushroom_generations_different():
         if new_mush != mush:
             at_least_one_different = True
     assert at_least_one_different
+
+
+def test_grid_environment_world_view():
+    """
+    Test that the grid environment exposes its mushrooms as a dictionary in placement order
+    """
+
+    env = GridEnvironment(5, 5, 0, 0)
+    env.world[(3, 1)] = 0b1111100000
+    env.add_mushroom((0, 4), 0b0000011111)
+    env.world[(2, 2)] = 0b1111100001
+    assert list(env.world) == [(3, 1), (0, 4), (2, 2)]
+    assert env.world[(0, 4)] == 0b0000011111
+    assert (1, 1) not in env.world and (9, 9) not in env.world
+    del env.world[(3, 1)]
+    assert dict(env.world) == {(0, 4): 0b0000011111, (2, 2): 0b1111100001}
+    assert env.grid.sum() == 0b0000011111 + 0b1111100001
+
+
+def test_grid_environment_reset_mushrooms():
+    """
+    Test that resetting the grid environment places distinct edible and poisonous mushrooms
+    """
+
+    env = GridEnvironment(6, 6, 12, 20)
+    mushrooms = list(env.world.values())
+    assert len(mushrooms) == 32 and (env.grid != 0).sum() == 32
+    assert len([mush for mush in mushrooms if environment.is_edible(mush)]) == 20
+    assert set(mushrooms) <= set(environment.all_mushrooms())
+
+
+def test_vector_environment_reset():
+    """
+    Test that resetting a vector environment places the mushrooms and entity of each world
+    """
+
+    envs = environment.VectorEnvironment(50, 6, 5, 12, 8)
+    flat = envs.grid.reshape(50, -1)
+    assert ((flat != 0).sum(axis=1) == 20).all()
+    assert (environment.is_edible(flat[flat != 0]).reshape(50, 20).sum(axis=1) == 8).all()
+    assert set(flat[flat != 0].tolist()) <= set(environment.all_mushrooms())
+    assert (envs.grid[np.arange(50), envs.positions[:, 0], envs.positions[:, 1]] == 0).all()
+    assert ((envs.directions >= 0) & (envs.directions < 4)).all()
+    with pytest.raises(WorldFull):
+        environment.VectorEnvironment(2, 4, 5, 10, 10)
+
+
+def test_vector_environment_observe_active():
+    """
+    Test that observing some of the worlds gives their observations and 0 for the rest
+    """
+
+    envs = environment.VectorEnvironment(20, 8, 6, 5, 5)
+    active = np.random.random_sample(20) < 0.5
+    full = envs.observe()
+    partial = envs.observe(active)
+    for observed, expected in zip(partial, full):
+        assert (observed[active] == expected[active]).all()
+        assert (observed[~active] == 0).all()
+
+
+def test_vector_environment_matches_environment():
+    """
+    Test that a vector environment observes and steps in the same way as separate environments
+    """
+
+    envs = [Environment(8, 6, 5, 5) for _ in range(10)]
+    vector = environment.VectorEnvironment(10, 8, 6, 5, 5)
+    for i, env in enumerate(envs):
+        env.place_entity()
+        vector.load(i, env)
+
+    for _ in range(40):
+        angles, perceptions, closest = vector.observe()
+        facing_out = vector.facing_out()
+        actions = np.random.randint(0, 4, 10)
+        eaten = vector.step(actions)
+        for i, env in enumerate(envs):
+            entity_pos = env.get_entity_position()
+            mush_pos = env.closest_mushroom(entity_pos)
+            assert angles[i] == env.get_entity_angle_to_position(mush_pos)
+            assert closest[i] == env.get_cell(mush_pos)
+            assert perceptions[i] == (closest[i] if env.adjacent(entity_pos, mush_pos) else 0)
+            assert facing_out[i] == env.entity_facing_out()
+            env.move_entity(Action(actions[i]))
+            new_pos = env.get_entity_position()
+            assert eaten[i] == env.get_cell(new_pos)
+            env.clear_cell(new_pos)
+            assert tuple(vector.positions[i]) == new_pos
+
+
+def test_grid_environment_passes_environment_tests(monkeypatch):
+    """
+    Runs every other test in this module with Environment replaced by GridEnvironment
+    """
+
+    module = sys.modules[__name__]
+    tests = [
+        test for name, test in vars(module).items()
+        if name.startswith("test_") and "grid_environment" not in name
+    ]
+    monkeypatch.setattr(module, "Environment", GridEnvironment)
+    for test in tests:
+        test()
+
+
+def test_seeded_worlds():
+    """
+    Test that environments generated from random.Random instances with the same seed
+    have the same worlds and entity placements
+    """
+
+    envs = [environment.Environment(10, 10, 5, 5, rng=random.Random(3)) for _ in range(2)]
+    for _ in range(3):
+        for env in envs:
+            env.place_entity()
+        assert envs[0].world == envs[1].world
+        assert envs[0].entity_position == envs[1].entity_position
+        assert envs[0].entity_direction == envs[1].entity_direction
+        for env in envs:
+            env.reset()
+
+
+def test_world_bank():
+    """
+    Test that loading a world bank gives the worlds generated from the same rng,
+    in every kind of environment
+    """
+
+    bank = environment.WorldBank(3, 10, 8, 5, 4, rng=random.Random(7))
+    assert len(bank) == 3
+    env = environment.Environment(10, 8, 5, 4, rng=random.Random(7))
+    vector = environment.VectorEnvironment(2, 10, 8, 5, 4)
+    loaded = [make(10, 8, 5, 4) for make in environment.ENVIRONMENTS.values()]
+    for index in range(3):
+        if index > 0:
+            env.reset()
+        env.place_entity()
+        vector.load_world(bank, index)
+        for other in loaded:
+            other.load_world(bank, index)
+            assert dict(other.world) == dict(env.world)
+            assert list(other.world) == list(env.world)
+            assert other.entity_position == env.entity_position
+            assert other.entity_direction == env.entity_direction
+            assert other.closest_mushroom(other.entity_position) == env.closest_mushroom(
+                env.entity_position)
+        for i in range(2):
+            assert tuple(vector.positions[i]) == env.entity_position
+            assert environment.DIRECTIONS[vector.directions[i]] == env.entity_direction
+            for pos, mushroom in env.world.items():
+                assert vector.grid[i][pos] == mushroom
+            assert np.count_nonzero(vector.grid[i]) == len(env.world)
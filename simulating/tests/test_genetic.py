@@ -0,0 +1,69 @@
+"""
+This module runs all the tests for the genetic module
+"""
+
+import numpy as np
+
+from simulating import genetic
+from simulating.entity import NeuralEntity
+from simulating.simulation import Simulation
+
+
+def test_select_best_matches_stable_sort():
+    """
+    Test that selection gives the best entities in the order of a stable sort
+    """
+
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        fitness = rng.integers(-3, 3, 20)
+        num_keep = int(rng.integers(0, 21))
+        ranking = sorted(range(len(fitness)), key=lambda i: fitness[i], reverse=True)
+        assert genetic.select_best(fitness, num_keep).tolist() == ranking[:num_keep]
+
+
+def test_reproduce_genomes():
+    """
+    Test that each of the best genomes produces consecutive mutated children
+    """
+
+    genomes = np.repeat(np.arange(6.0)[:, np.newaxis] * 10, 4, axis=1)
+    fitness = np.array([1, 5, 3, 5, 0, 2])
+    children = genetic.reproduce(genomes, fitness, 3, 2, 0)
+    assert children.tolist() == [[10.0] * 4] * 2 + [[30.0] * 4] * 2 + [[20.0] * 4] * 2
+    assert genomes[:, 0].tolist() == [0, 10, 20, 30, 40, 50]
+
+    children = genetic.reproduce(genomes, fitness, 3, 2, 1)
+    assert (np.abs(children - np.repeat(genomes[[1, 3, 2]], 2, axis=0)) <= 1).all()
+    assert not np.array_equal(children[0], children[1])
+
+
+def test_reproduce_in_chunks(monkeypatch):
+    """
+    Test that reproducing in chunks writes every child into the given matrix
+    """
+
+    monkeypatch.setattr(genetic, "CHUNK_PARAMETERS", 14)
+    genomes = np.random.random_sample((10, 7))
+    out = np.zeros((12, 7))
+    children = genetic.reproduce(genomes, np.arange(10), 4, 3, 1, out)
+    assert np.shares_memory(children, out)
+    parents = np.repeat(genomes[[9, 8, 7, 6]], 3, axis=0)
+    assert (np.abs(out - parents) <= 1).all()
+    assert (out != parents).all()
+
+
+def test_reproduce_population_keeps_best():
+    """
+    Test that the new population of a simulation descends from the best entities
+    """
+
+    sim = Simulation(4, 5, 10, 7, "None", percentage_keep=0.2, percentage_mutate=0)
+    entities = [NeuralEntity(fitness) for fitness in [3, 1, 7, 2, 7, 0, 5, 6, 4, 1]]
+    new_entities = sim.reproduce_population(entities)
+    assert len(new_entities) == 10
+    for i, child in enumerate(new_entities):
+        parent = entities[[2, 4][i // 5]]
+        assert child.fitness == 0
+        assert np.array_equal(child.genome, parent.genome)
+        assert child.layers_units == parent.layers_units
@@ -2,9 +2,13 @@
 This module runs all the tests for the Neural Entity class
 """
 
+import pickle
+import random
+
 import numpy as np
 
 from simulating.action import Action
+from simulating import environment
 import simulating.entity as entity
 
 
@@ -43,16 +47,13 @@ def test_relu():
 
 def test_activation():
     """
-    Test the activation function
+    Test the activation function of each configuration
     """
 
     x = np.random.randn(100)
-    entity.ACTIVATION = "identity"
-    y1 = entity.activation(x)
-    entity.ACTIVATION = "relu"
-    y2 = entity.activation(x)
-    entity.ACTIVATION = "sigmoid"
-    y3 = entity.activation(x)
+    y1 = entity.NetworkConfig("identity").activate(x)
+    y2 = entity.NetworkConfig("relu").activate(x)
+    y3 = entity.NetworkConfig("sigmoid").activate(x)
 
     assert (y1 == x).all()
     assert (y2 == entity.relu(x)).all()
@@ -141,6 +142,24 @@ def test_forward_propogation_binary_values():
         assert out in (0, 1)
 
 
+def test_feed_forward_stacked():
+    """
+    Test that feeding inputs through stacked networks gives the same outputs
+    as forward propagation through each network
+    """
+
+    entities = [entity.NeuralEntity(0, [5, 4]) for _ in range(10)]
+    weights, biases = entity.stack_parameters(entities)
+    assert weights[1].shape == (10, 5, 14)
+    assert biases[3].shape == (10, 5, 1)
+
+    inputs = np.random.random_sample((10, 14, 1))
+    outputs = entity.feed_forward(weights, biases, inputs)
+    assert outputs.shape == (10, 5, 1)
+    for i, ent in enumerate(entities):
+        assert list(outputs[i, :, 0]) == ent.forward_propagation(inputs[i])
+
+
 def test_behaviour_output_correct():
     """
     Test that the behaviour call outputs an action and a 3-bit vocal call
@@ -154,6 +173,317 @@ def test_behaviour_output_correct():
         assert x in (0, 1)
 
 
+def test_behaviour_vocals_are_copies():
+    """
+    Test that changing a vocal returned by an entity or its compiled table does not
+    change the vocals returned later
+    """
+
+    ent = entity.NeuralEntity()
+    table = ent.compile([(0.25, 0)], [[0, 1, 0]])
+    for behaviour in [ent.behaviour, table.behaviour]:
+        _, vocal = behaviour(0.25, 0, [0, 1, 0])
+        expected = list(vocal)
+        vocal[:] = [9, 9, 9]
+        assert behaviour(0.25, 0, [0, 1, 0])[1] == expected
+    assert all(isinstance(vocal, tuple) for _, vocal in entity.OUTPUTS)
+
+
+def test_behaviour_matches_rounded_outputs():
+    """
+    Test that thresholding the final layer gives the same outputs as rounding
+    its activation, for sigmoid and linear outputs and every activation
+    """
+
+    for linear in [False, True]:
+        for activation in ["identity", "sigmoid", "relu"]:
+            config = entity.NetworkConfig(activation, linear, [8, 3])
+            ent = entity.NeuralEntity(config=config)
+            for _ in range(50):
+                location = random.random()
+                perception = random.randrange(1024)
+                listening = [random.randint(0, 1) for _ in range(3)]
+                activations = np.array([[location]] +
+                                       [[bit] for bit in entity.bits_to_array(perception, 10)] +
+                                       [[bit] for bit in listening])
+                for layer in range(1, len(ent.weights)):
+                    activations = np.matmul(ent.weights[layer], activations) + ent.biases[layer]
+                    if layer < len(ent.weights) - 1:
+                        activations = config.activate(activations)
+                outputs = activations if linear else entity.sigmoid(activations)
+                outputs = [int(out) for out in np.round(outputs[:, 0]) >= 1]
+                action, vocal = ent.behaviour(location, perception, listening)
+                assert action == Action(2 * outputs[0] + outputs[1])
+                assert vocal == outputs[2:5]
+
+
+def test_mushroom_bits():
+    """
+    Test that the table of mushroom bits matches bits_to_array
+    """
+
+    for mushroom in range(1024):
+        assert list(entity.MUSHROOM_BITS[mushroom]) == entity.bits_to_array(mushroom, 10)
+
+
+def test_make_inputs():
+    """
+    Test that each column of a batch of inputs holds one observation
+    """
+
+    inputs = entity.make_inputs([0.25, 0.5], [0b1111100000, 0], [[0.5, 0.5, 0.5], [1, 0, 0]])
+    assert inputs.shape == (14, 2)
+    assert list(inputs[:, 0]) == [0.25, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0.5, 0.5, 0.5]
+    assert list(inputs[:, 1]) == [0.5, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0]
+
+
+def test_batch_behaviour_matches_behaviour(monkeypatch):
+    """
+    Test that the batched behaviour gives the same actions and vocals as
+    calling behaviour for each observation, for deep and linear networks
+    """
+
+    locations = list(np.random.random_sample(50))
+    perceptions = list(np.random.randint(0, 1024, 50))
+    listenings = [list(np.random.randint(0, 2, 3)) for _ in range(50)]
+    inputs = entity.make_inputs(locations, perceptions, listenings)
+
+    for linear in [False, True]:
+        monkeypatch.setattr(entity, "LINEAR", linear)
+        for hidden_units in [[5], [8, 3, 6]]:
+            ent = entity.NeuralEntity(0, hidden_units)
+            actions, vocals = ent.batch_behaviour(inputs)
+            assert actions.shape == (50, )
+            assert vocals.shape == (50, 3)
+            for i in range(50):
+                action, vocal = ent.behaviour(locations[i], perceptions[i], listenings[i])
+                assert actions[i] == action.value
+                assert list(vocals[i]) == vocal
+
+
+def test_entity_batch_behaviour():
+    """
+    Test that the default batched behaviour returns the behaviour of each observation
+    """
+
+    inputs = entity.make_inputs([0, 0.375], [0, 0], [[0.5, 0.5, 0.5]] * 2)
+    actions, vocals = entity.ManualEntity().batch_behaviour(inputs)
+    assert list(actions) == [Action.FORWARDS.value, Action.RIGHT.value]
+    assert (vocals == 0).all()
+
+
+def test_compile_matches_behaviour():
+    """
+    Test that a compiled behaviour table gives the same behaviour as the entity,
+    including for inputs outside of the table
+    """
+
+    ent = entity.NeuralEntity(0, [5])
+    observations = [(angle, 0) for angle in np.linspace(0, 1, 20)]
+    observations += [(0.125, 0b1111100000), (0.5, 0b0000011111)]
+    listenings = [[0.5, 0.5, 0.5], [1, 0, 0]]
+    table = ent.compile(observations, listenings)
+    for location, perception in observations + [(0.3, 0b0000011110)]:
+        for listening in listenings + [[0, 1, 1]]:
+            assert (table.behaviour(location, perception, listening) == ent.behaviour(
+                location, perception, listening))
+
+
+def test_signal_table_matches_behaviour():
+    """
+    Test that the signals in a table match the behaviour of each entity as a partner
+    """
+
+    entities = [entity.NeuralEntity() for _ in range(5)]
+    angles = [0, 0.125, 0.5, 0.875]
+    mushrooms = environment.all_mushrooms()
+    table = entity.SignalTable(entities, angles, mushrooms)
+    assert table.vocals.shape == (5, 4, 20) and (table.vocals == table.UNKNOWN).all()
+    table.fill([0, 1, 3], mushrooms[:3])
+    assert (table.vocals[:, [0, 1, 3], [0, 1, 2]] != table.UNKNOWN).all()
+    table.fill(np.repeat(np.arange(4), 20), mushrooms * 4)
+    for i, ent in enumerate(entities):
+        for j, angle in enumerate(angles):
+            for k, mush in enumerate(mushrooms):
+                _, vocal = ent.behaviour(angle, mush, [0.5, 0.5, 0.5])
+                assert entity.bits_to_array(table.vocals[i, j, k], 3) == vocal
+
+
+def test_signal_table_excludes_self():
+    """
+    Test that a signal table chooses partners as a random choice of the other entities
+    """
+
+    entities = [entity.NeuralEntity() for _ in range(4)]
+    angles = [0, 0.25, 0.5, 0.75]
+    mushrooms = environment.all_mushrooms()
+    table = entity.SignalTable(entities, angles, mushrooms).excluding(2)
+    assert len(table) == 3
+    for seed in range(20):
+        random.seed(seed)
+        signal = table.signal(0.75, mushrooms[seed])
+        random.seed(seed)
+        partner = random.choice(entities[:2] + entities[3:])
+        assert signal == partner.behaviour(0.75, mushrooms[seed], [0.5, 0.5, 0.5])[1]
+
+    partners = np.array([0, 1, 3, 3])
+    signals = table.signals(partners, np.array(angles), np.array(mushrooms[:4]))
+    for partner, angle, mush, signal in zip(partners, angles, mushrooms, signals.tolist()):
+        assert signal == entities[partner].behaviour(angle, mush, [0.5, 0.5, 0.5])[1]
+
+
+def test_draw_partners():
+    """
+    Test that partners are drawn from the rest of the population, reproducibly from a seed
+    """
+
+    partners = entity.draw_partners(5, 1000, np.random.default_rng(3))
+    assert partners.shape == (5, 1000)
+    for i in range(5):
+        assert set(partners[i].tolist()) == set(range(5)) - {i}
+    assert (partners == entity.draw_partners(5, 1000, np.random.default_rng(3))).all()
+
+
+def test_signal_table_drawn_partners():
+    """
+    Test that a signal table uses pre-drawn partners in turn
+    """
+
+    entities = [entity.NeuralEntity() for _ in range(4)]
+    mushrooms = environment.all_mushrooms()
+    table = entity.SignalTable(entities, [0.25], mushrooms).excluding(0, [3, 1, 2, 1])
+    for mush, partner in zip(mushrooms, [3, 1, 2, 1]):
+        assert table.signal(0.25, mush) == entities[partner].behaviour(0.25, mush,
+                                                                      [0.5, 0.5, 0.5])[1]
+    assert table.draws == 4
+
+
+def test_genome_views():
+    """
+    Test that the weights and biases of an entity are views of its genome
+    """
+
+    ent = entity.NeuralEntity(0, [4, 3])
+    assert ent.layers_units == [14, 4, 3, 5]
+    assert ent.genome.shape == (entity.genome_size([14, 4, 3, 5]), )
+    assert ent.genome.size == 4 * 15 + 3 * 5 + 5 * 4
+    ent.weights[2][1, 2] = 7
+    ent.biases[3][4] = 8
+    assert ent.genome[4 * 15 + 1 * 4 + 2] == 7
+    assert ent.genome[-1] == 8
+    assert not hasattr(ent, "__dict__")
+
+
+def test_stack_parameters():
+    """
+    Test that stacking a population gives the parameters of each entity
+    """
+
+    entities = [entity.NeuralEntity(0, [4, 3]) for _ in range(3)]
+    weights, biases = entity.stack_parameters(entities)
+    for layer in range(1, 4):
+        assert (weights[layer] == np.stack([ent.weights[layer] for ent in entities])).all()
+        assert (biases[layer] == np.stack([ent.biases[layer] for ent in entities])).all()
+
+
+def test_pickle_keeps_views():
+    """
+    Test that an unpickled entity still has parameters that are views of its genome
+    """
+
+    ent = pickle.loads(pickle.dumps(entity.NeuralEntity(4, [6])))
+    assert ent.fitness == 4
+    assert np.shares_memory(ent.weights[1], ent.genome)
+    assert np.shares_memory(ent.biases[2], ent.genome)
+
+
+def test_unpickle_legacy_entity():
+    """
+    Test that entities pickled with lists of weights and biases can still be loaded
+    """
+
+    ent = entity.NeuralEntity(0, [6])
+    legacy = entity.NeuralEntity.__new__(entity.NeuralEntity)
+    legacy.__setstate__({
+        "fitness": 3,
+        "weights": [None] + [w.copy() for w in ent.weights[1:]],
+        "biases": [None] + [b.copy() for b in ent.biases[1:]]
+    })
+    assert legacy.fitness == 3
+    assert legacy.layers_units == [14, 6, 5]
+    assert legacy.equal_network(ent)
+    assert (legacy.genome == ent.genome).all()
+
+
+def test_float32_entity(monkeypatch):
+    """
+    Test that entities created in float32 mode keep float32 parameters through
+    reproduction and pickling, and behave the same singly and in batches
+    """
+
+    monkeypatch.setattr(entity, "DTYPE", np.float32)
+    ent = entity.NeuralEntity(0, [8, 3])
+    children = ent.reproduce(3, 0.5)
+    loaded = pickle.loads(pickle.dumps(children[0]))
+    monkeypatch.undo()
+
+    for child in [ent, loaded] + children:
+        assert child.genome.dtype == np.float32
+        assert child.weights[1].dtype == np.float32
+    assert loaded.equal_network(children[0])
+
+    locations = list(np.random.random_sample(20))
+    perceptions = list(np.random.randint(0, 1024, 20))
+    listenings = [list(np.random.randint(0, 2, 3)) for _ in range(20)]
+    actions, vocals = ent.batch_behaviour(entity.make_inputs(locations, perceptions, listenings))
+    for i in range(20):
+        action, vocal = ent.behaviour(locations[i], perceptions[i], listenings[i])
+        assert actions[i] == action.value
+        assert list(vocals[i]) == vocal
+
+
+def test_network_config(monkeypatch):
+    """
+    Test that a population shares its configuration through reproduction and
+    pickling, and that the configuration is independent of the module defaults
+    """
+
+    config = entity.NetworkConfig("sigmoid", True, [4, 3], np.float32)
+    assert config.layers_units == [14, 4, 3, 5]
+    assert config.activate is entity.sigmoid and config.threshold == 0.5
+    population = [entity.NeuralEntity(config=config)] + entity.NeuralEntity(
+        config=config).reproduce(3, 0.5)
+    loaded = pickle.loads(pickle.dumps(population))
+    for ent in population:
+        assert ent.config is config
+    for ent in loaded:
+        assert ent.config is loaded[0].config
+    assert loaded[0].config == config
+    assert loaded[0].config.activate is entity.sigmoid
+    assert loaded[1].genome.dtype == np.float32
+
+    inputs = entity.make_inputs([0.25, 0.5], [0b1111100000, 0], [[0.5, 0.5, 0.5], [1, 0, 0]])
+    actions, vocals = population[0].batch_behaviour(inputs)
+    monkeypatch.setattr(entity, "ACTIVATION", "relu")
+    monkeypatch.setattr(entity, "LINEAR", False)
+    assert entity.default_config().activation == "relu"
+    assert (population[0].batch_behaviour(inputs)[0] == actions).all()
+    assert (population[0].batch_behaviour(inputs)[1] == vocals).all()
+
+
+def test_unpickle_entity_without_config():
+    """
+    Test that an entity pickled before configurations were introduced gets the default one
+    """
+
+    ent = entity.NeuralEntity(0, [6])
+    legacy = entity.NeuralEntity.__new__(entity.NeuralEntity)
+    legacy.__setstate__((3, [14, 6, 5], ent.genome))
+    assert legacy.fitness == 3
+    assert legacy.config == entity.default_config([6])
+    assert legacy.equal_network(ent)
+
+
 def test_reproduce():
     """
     Test that reproduction creates offspring
@@ -168,6 +498,35 @@ def test_reproduce():
         assert len(child.biases) == len(ent.biases)
 
 
+def test_mutate():
+    """
+    Test that mutation changes about the given percentage of parameters by at most 1
+    """
+
+    genomes = np.zeros((20, 1000))
+    entity.mutate(genomes, 0.1)
+    mutated = genomes != 0
+    assert 0.08 < mutated.mean() < 0.12
+    assert (np.abs(genomes) <= 1).all()
+    genomes = np.zeros(1000)
+    entity.mutate(genomes, 0)
+    assert (genomes == 0).all()
+
+
+def test_reproduce_mutates_children():
+    """
+    Test that each child differs from its parent in about the given percentage of parameters
+    """
+
+    ent = entity.NeuralEntity(0, [64, 64])
+    children = ent.reproduce(5, 0.1)
+    for child in children:
+        changed = child.genome != ent.genome
+        assert 0.08 < changed.mean() < 0.12
+        assert (np.abs(child.genome - ent.genome) <= 1).all()
+    assert not np.array_equal(children[0].genome, children[1].genome)
+
+
 def test_reproduce_new_parameters():
     """
     Test that reproduction creates unique parameters
@@ -214,6 +573,7 @@ def test_copy_equals_network():
     copy = ent.copy()
     assert ent.equal_network(copy)
     assert copy.equal_network(ent)
+    assert not np.shares_memory(copy.genome, ent.genome)
 
 
 def test_different_entities_not_equal():
@@ -0,0 +1,96 @@
+"""
+This module runs all the tests for the parallel module
+"""
+
+import pickle
+import random
+
+import numpy as np
+
+from simulating import parallel
+import simulating.entity as entity_module
+from simulating.entity import NeuralEntity
+from simulating.simulation import Simulation
+from simulating.stats import EvaluationStats
+
+
+def test_initialise_worker():
+    """
+    Test that initialising a worker sets its simulation and network configuration
+    without changing the module defaults
+    """
+
+    config = entity_module.NetworkConfig("relu", True)
+    sim = Simulation(2, 5, 5, 3, "None")
+    parallel.initialise_worker(sim, pickle.loads(pickle.dumps(config)))
+    assert parallel.SIMULATION is sim
+    assert parallel.CONFIG == config
+    assert parallel.CONFIG.activate is entity_module.relu
+    assert entity_module.ACTIVATION == "identity" and not entity_module.LINEAR
+
+
+def test_shared_population():
+    """
+    Test that a published population can be read through another attachment
+    """
+
+    config = entity_module.NetworkConfig(hidden_units=[4])
+    entities = [NeuralEntity(config=config) for _ in range(3)]
+    shared = parallel.SharedPopulation(config, 4, num_draws=2)
+    attached = parallel.SharedPopulation(config, 4, shared.memory.name, 2)
+    shared.publish(entities, [[1, 2], [0, 2], [1, 0]])
+    for i, entity in enumerate(entities):
+        assert attached.entity(i).equal_network(entity)
+    assert attached.partners[:3].tolist() == [[1, 2], [0, 2], [1, 0]]
+    assert np.shares_memory(attached.entity(2).weights[1], attached.genomes)
+    assert attached.entity(2).config is config
+    attached.close()
+    shared.close(unlink=True)
+
+
+def test_shared_population_float32():
+    """
+    Test that float32 genomes are shared with the partners aligned after them
+    """
+
+    config = entity_module.NetworkConfig(hidden_units=[3], dtype=np.float32)
+    entities = [NeuralEntity(config=config) for _ in range(3)]
+    shared = parallel.SharedPopulation(config, 3, num_draws=2)
+    attached = parallel.SharedPopulation(config, 3, shared.memory.name, 2)
+    shared.publish(entities, [[1, 2], [0, 2], [1, 0]])
+    assert attached.genomes.dtype == np.float32
+    assert attached.entity(1).equal_network(entities[1])
+    assert attached.partners[:3].tolist() == [[1, 2], [0, 2], [1, 0]]
+    attached.close()
+    shared.close(unlink=True)
+
+
+def test_evaluate():
+    """
+    Test that evaluating an entity in a worker returns the statistics of its simulation
+    """
+
+    entities = [NeuralEntity() for _ in range(3)]
+    sim = Simulation(2, 20, 3, 1, "Evolved", seed=1)
+    partners = sim.draw_partners(3)
+    shared = parallel.SharedPopulation(entities[0].config, 3, num_draws=40)
+    shared.publish(entities, partners)
+    parallel.initialise_worker(sim, entities[0].config, (shared.memory.name, shared.capacity, 40))
+    table = sim.signal_table(entities)
+    for i in range(3):
+        random.seed(i)
+        stats = parallel.evaluate(i, 3, 0)
+        assert stats.fitness == parallel.ENTITIES[i].fitness
+        random.seed(i)
+        single_stats = EvaluationStats()
+        single = sim.run_single(entities[i].copy(), table.excluding(i, partners[i]),
+                                stats=single_stats)
+        assert single.fitness == stats.fitness
+        assert single_stats == stats
+    table = parallel.TABLE
+    parallel.evaluate(0, 3, 0)
+    assert parallel.TABLE is table
+    parallel.evaluate(0, 3, 1)
+    assert parallel.TABLE is not table
+    parallel.SHARED.close()
+    shared.close(unlink=True)
@@ -0,0 +1,61 @@
+"""
+This module runs all the tests for plotting the results of simulations
+"""
+
+import matplotlib
+import pytest
+matplotlib.use("Agg")
+
+from analysis import plotting  #pylint: disable=C0413
+from simulating.stats import PHASES  #pylint: disable=C0413
+from simulating.stats import PhaseTimes  #pylint: disable=C0413
+
+OPTIMISATIONS = [
+    "No Optimisations", "Detect Looping", "Skip None", "Skip Edge", "All Optimisations"
+]
+
+
+def test_read_times(tmp_path):
+    """
+    Test that the total time of each generation is read from both kinds of time.txt
+    """
+
+    times = PhaseTimes()
+    times.lap("evaluation")
+    with open(tmp_path / "time.txt", "w") as time_file:
+        time_file.write(" ".join(["generation"] + PHASES + ["total"]) + "\n")
+        for generation in range(3):
+            time_file.write(" ".join(str(value)
+                                     for value in [generation] + times.row()) + "\n")
+    assert plotting.read_times(tmp_path / "time.txt") == [times.total()] * 3
+
+    with open(tmp_path / "legacy.txt", "w") as time_file:
+        time_file.write("1.5\n2.25\n")
+    assert plotting.read_times(tmp_path / "legacy.txt") == [1.5, 2.25]
+
+
+def test_time_average(tmp_path, monkeypatch):
+    """
+    Test that the times of every optimisation are plotted from files of phase times
+    """
+
+    times = PhaseTimes()
+    times.lap("evaluation")
+    for optimisation in OPTIMISATIONS:
+        for i in range(10):
+            folder = tmp_path / optimisation.lower() / "None{}".format(i)
+            folder.mkdir(parents=True)
+            with open(folder / "time.txt", "w") as time_file:
+                time_file.write(" ".join(["generation"] + PHASES + ["total"]) + "\n")
+                for generation in range(3):
+                    time_file.write(" ".join(str(value)
+                                             for value in [generation] + times.row()) + "\n")
+
+    lines = []
+    monkeypatch.setattr(plotting.plt, "show", lambda: None)
+    monkeypatch.setattr(plotting.plt, "legend", lambda: lines.extend(
+        plotting.plt.gca().get_lines()))
+    plotting.time_average(str(tmp_path), 2)
+    assert len(lines) == len(OPTIMISATIONS)
+    for line in lines:
+        assert list(line.get_ydata()) == pytest.approx([times.total()] * 3)
@@ -3,12 +3,25 @@ This module runs all the tests for the Simulation class
 """
 
 import pickle
+import random
 import shutil
 
+import numpy as np
+import pytest
+
 from simulating.simulation import Simulation
 from simulating.simulation import Language
+from simulating.simulation import parse_optimisation
 from simulating.entity import Entity
+from simulating.entity import ManualEntity
+from simulating.entity import NetworkConfig
 from simulating.entity import NeuralEntity
+from simulating.entity import default_config
+from simulating import environment
+from simulating import parallel
+from simulating.stats import EvaluationStats
+from simulating.stats import EXIT_REASONS
+from simulating.stats import PHASES
 
 
 def test_new_simulation():
@@ -46,6 +59,36 @@ def test_io_params():
     assert sim.foldername == "example"
 
 
+def test_world_options():
+    """
+    Test that world options are used for the environments entities are simulated in
+    """
+
+    sim = Simulation(4, 5, 6, 7, "None")
+    sim.set_world_options(width=50, height=40, edible=30, poisonous=20, spatial_index="grid")
+    env = sim.make_environment()
+    assert env.dim_x == 50 and env.dim_y == 40
+    assert env.num_edible == 30 and env.num_poisonous == 20
+    assert len(env.world) == 50
+    assert sim.run_single(NeuralEntity()).fitness % 1 == 0
+
+
+def test_parse_optimisation():
+    """
+    Test that a comma-separated list of optimisations is parsed and "all" is expanded
+    """
+
+    assert parse_optimisation("none") == {"none"}
+    assert parse_optimisation("lockstep,skip_none") == {"lockstep", "skip_none"}
+    all_modes = parse_optimisation("all")
+    assert {"parallel", "skip_none", "skip_facing_out", "detect_looping"} <= all_modes
+
+    sim = Simulation(4, 5, 6, 7, "None", optimisation="all,lockstep")
+    assert sim.lockstep and sim.threading and sim.skip_none and sim.detect_looping
+    sim = Simulation(4, 5, 6, 7, "None", optimisation="skip_facing_out")
+    assert not sim.lockstep and not sim.threading and sim.skip_facing_out
+
+
 def test_get_signal_no_language():
     """
     Test that getting the signal for a population without language
@@ -122,6 +165,197 @@ def test_reproduce_population():
     assert len(entities) == len(new_entities)
 
 
+@pytest.mark.usefixtures("mirrored_worlds")
+def test_run_lockstep_matches_run_single():
+    """
+    Test that the lockstep engine gives the same fitness as run_single
+    for a single entity in the same worlds
+    """
+
+    for language in ["None", "External"]:
+        for optimisation in ["all", "none"]:
+            sim = Simulation(5, 30, 1, 1, language, optimisation=optimisation)
+            for seed in range(10):
+                entity = NeuralEntity()
+                single, lockstep = entity.copy(), entity.copy()
+                random.seed(seed)
+                sim.run_single(single)
+                random.seed(seed)
+                sim.run_lockstep([lockstep])
+                assert single.fitness == lockstep.fitness
+
+
+def test_world_bank_lockstep_matches_run_single():
+    """
+    Test that the lockstep engine gives the same fitness as run_single for entities
+    run in the same bank of worlds
+    """
+
+    for language in ["None", "External"]:
+        sim = Simulation(5, 30, 4, 1, language, optimisation="none")
+        worlds = sim.make_world_bank(sim.world_seed(0))
+        entities = [NeuralEntity() for _ in range(4)]
+        lockstep = [entity.copy() for entity in entities]
+        sim.run_lockstep(lockstep, worlds=worlds)
+        for entity, other in zip(entities, lockstep):
+            assert sim.run_single(entity, worlds=worlds).fitness == other.fitness
+
+
+def test_world_bank_skips_generation(monkeypatch):
+    """
+    Test that no worlds are generated when entities are run in a bank of worlds
+    """
+
+    sim = Simulation(3, 20, 2, 1, "External", optimisation="none")
+    worlds = sim.make_world_bank(sim.world_seed(0))
+
+    def generate(*_):
+        raise AssertionError("world generated")
+
+    for environment_type, make in environment.ENVIRONMENTS.items():
+        sim.set_world_options(environment_type=environment_type)
+        with monkeypatch.context() as patch:
+            patch.setattr(make, "reset", generate)
+            patch.setattr(make, "place_entity", generate)
+            sim.run_single(NeuralEntity(), worlds=worlds)
+    monkeypatch.setattr(environment.VectorEnvironment, "reset", generate)
+    sim.run_lockstep([NeuralEntity(), NeuralEntity()], worlds=worlds)
+
+
+def test_detect_cycles_matches_run_single():
+    """
+    Test that ending epochs on a repeated state does not change fitness, in either
+    engine, and that it is not used with the Evolved language
+    """
+
+    for language in ["None", "External"]:
+        sim = Simulation(5, 40, 6, 1, language, optimisation="none")
+        cycles_sim = Simulation(5, 40, 6, 1, language, optimisation="none,detect_cycles")
+        assert cycles_sim.detect_cycles
+        worlds = sim.make_world_bank(sim.world_seed(0))
+        entities = [NeuralEntity() for _ in range(6)]
+        lockstep = [entity.copy() for entity in entities]
+        cycles_sim.run_lockstep(lockstep, worlds=worlds)
+        detected = 0
+        for entity, other in zip(entities, lockstep):
+            stats = EvaluationStats()
+            fitness = cycles_sim.run_single(entity.copy(), stats=stats, worlds=worlds).fitness
+            assert fitness == sim.run_single(entity, worlds=worlds).fitness == other.fitness
+            detected += stats.exit_counts()["detect_cycles"]
+        assert detected > 0
+    assert not Simulation(5, 40, 6, 1, "Evolved", optimisation="detect_cycles").detect_cycles
+
+
+def test_fast_forward_matches_run_single():
+    """
+    Test that moving straight to mushrooms without evaluating the entity gives the
+    same fitness and statistics as taking every step, in both kinds of environment
+    """
+
+    for environment_type in environment.ENVIRONMENTS:
+        for optimisation in ["none", "all,detect_cycles"]:
+            sim = Simulation(5, 40, 1, 1, "External", optimisation=optimisation)
+            fast_sim = Simulation(5, 40, 1, 1, "External",
+                                  optimisation=optimisation + ",fast_forward")
+            for simulation in [sim, fast_sim]:
+                simulation.set_world_options(environment_type=environment_type)
+            worlds = sim.make_world_bank(sim.world_seed(0))
+            for entity in [ManualEntity(), NeuralEntity()]:
+                single, fast = EvaluationStats(), EvaluationStats()
+                sim.run_single(entity, stats=single, worlds=worlds)
+                fast_sim.run_single(entity, stats=fast, worlds=worlds)
+                # Only the evaluations of the entity and the searches are skipped
+                assert fast.searches <= single.searches and fast.passes <= single.passes
+                if isinstance(entity, ManualEntity):
+                    assert fast.passes < single.passes
+                fast.passes, fast.searches = single.passes, single.searches
+                assert single == fast
+    assert not Simulation(5, 40, 6, 1, "Evolved", optimisation="fast_forward").fast_forward
+
+
+def test_compiled_run_single_matches():
+    """
+    Test that compiling entities into lookup tables does not change their fitness
+    """
+
+    for language in ["None", "External", "Evolved"]:
+        sim = Simulation(5, 30, 1, 1, language, optimisation="none")
+        compiled_sim = Simulation(5, 30, 1, 1, language, optimisation="none,compile")
+        population = [NeuralEntity() for _ in range(3)]
+        for seed in range(5):
+            entity = NeuralEntity()
+            single, compiled = entity.copy(), entity.copy()
+            random.seed(seed)
+            sim.run_single(single, population)
+            random.seed(seed)
+            compiled_sim.run_single(compiled, population)
+            assert single.fitness == compiled.fitness
+        assert compiled_sim.compiled == (language != "Evolved")
+
+
+def test_run_single_signal_table_matches():
+    """
+    Test that looking up partner signals in a signal table does not change fitness
+    """
+
+    sim = Simulation(5, 30, 4, 1, "Evolved", optimisation="none")
+    population = [NeuralEntity() for _ in range(4)]
+    table = sim.signal_table(population)
+    for seed in range(5):
+        entity = NeuralEntity()
+        single, looked_up = entity.copy(), entity.copy()
+        random.seed(seed)
+        sim.run_single(single, population[:1] + population[2:])
+        random.seed(seed)
+        sim.run_single(looked_up, table.excluding(1))
+        assert single.fitness == looked_up.fitness
+
+
+def test_draw_partners_seeded():
+    """
+    Test that seeded simulations draw the same partners for a generation
+    """
+
+    sim = Simulation(3, 10, 6, 2, "Evolved", seed=5)
+    assert sim.draw_partners(6, 1).shape == (6, 30)
+    assert (sim.draw_partners(6, 1) == Simulation(3, 10, 6, 2, "Evolved",
+                                                   seed=5).draw_partners(6, 1)).all()
+    assert (sim.draw_partners(6, 1) != sim.draw_partners(6, 2)).any()
+
+
+def test_run_lockstep_evolved():
+    """
+    Test that the lockstep engine runs a population with the evolved language
+    """
+
+    sim = Simulation(2, 20, 5, 1, "Evolved", optimisation="lockstep")
+    entities = [NeuralEntity() for _ in range(5)]
+    population = [entity.copy() for entity in entities]
+    assert sim.run_lockstep(entities, population) is entities
+    for entity in entities:
+        assert entity.fitness % 1 == 0
+
+
+def test_evolved_lockstep_matches_run_single():
+    """
+    Test that the lockstep engine gives the same fitness as run_single with the
+    evolved language for the same partners and worlds, when epochs end early
+    """
+
+    for optimisation in ["none", "skip_none,skip_facing_out,detect_looping"]:
+        sim = Simulation(5, 40, 10, 4, "Evolved", optimisation=optimisation, seed=3)
+        worlds = sim.make_world_bank(sim.world_seed(0))
+        entities = [NeuralEntity() for _ in range(6)]
+        table = sim.signal_table(entities)
+        partners = sim.draw_partners(len(entities))
+        lockstep = [entity.copy() for entity in entities]
+        sim.run_lockstep(lockstep, table, partners, worlds=worlds)
+        for i, (entity, other) in enumerate(zip(entities, lockstep)):
+            single = sim.run_single(entity.copy(), sim.partners_of(i, table, partners),
+                                    worlds=worlds)
+            assert single.fitness == other.fitness
+
+
 def test_naming_task():
     """
     Tests that a naming task produces the correct number of samples in the correct range
@@ -174,6 +408,76 @@ def test_save_language():
         assert abs(sum(languages[i]["poisonous"]) - 1) < 1e-5
 
 
+def test_run_population_reuses_pool(monkeypatch):
+    """
+    Test that a parallel run creates its pool of workers once for every generation
+    """
+
+    pools = []
+
+    def make_pool(simulation, config, shared=None):
+        pools.append(make_worker_pool(simulation, config, shared))
+        return pools[-1]
+
+    make_worker_pool = parallel.make_pool
+    monkeypatch.setattr(parallel, "make_pool", make_pool)
+    sim = Simulation(2, 5, 5, 3, "Evolved", optimisation="parallel")
+    sim.set_io_options(foldername="testing")
+    sim.start()
+    languages = pickle.load(open("testing/language.p", "rb"))
+    shutil.rmtree('testing')
+    assert len(pools) == 1
+    assert len(languages) == 4
+
+
+def test_record_metrics():
+    """
+    Test that the counters of each generation are written with the average fitness
+    """
+
+    sim = Simulation(3, 10, 10, 2, "External", optimisation="all,deduplicate")
+    sim.set_io_options(record_language=False, record_entities=False, foldername="testing")
+    sim.start()
+    with open("testing/metrics.txt") as metrics_file:
+        header = metrics_file.readline().split()
+        rows = [dict(zip(header, map(int, line.split()))) for line in metrics_file]
+    with open("testing/fitness.txt") as fitness_file:
+        fitness = [float(line) for line in fitness_file]
+    shutil.rmtree('testing')
+    assert header[:4] == ["generation", "entities", "evaluated", "cycles"]
+    assert [row["generation"] for row in rows] == [0, 1, 2]
+    classification = 10 * len(sim.observations()) * len(sim.listenings())
+    for row, average in zip(rows, fitness):
+        assert row["entities"] == 10 and 0 < row["evaluated"] <= 10
+        assert row["cycles"] == row["evaluated"] * 30
+        assert row["fitness"] == round(average * 10)
+
+        # Only the work of the entities actually simulated is counted
+        assert row["steps"] + sum(row["saved_" + reason]
+                                  for reason in EXIT_REASONS) == row["cycles"]
+        assert sum(row["exits_" + reason] for reason in EXIT_REASONS) == row["evaluated"] * 3
+        assert row["passes"] - classification == row["steps"] <= row["searches"]
+
+
+def test_record_time():
+    """
+    Test that the time of each phase of each generation is written as a column
+    """
+
+    sim = Simulation(3, 10, 10, 2, "None", optimisation="all,parallel")
+    sim.set_io_options(record_entities=False, foldername="testing")
+    sim.start()
+    with open("testing/time.txt") as time_file:
+        header = time_file.readline().split()
+        rows = [dict(zip(header, map(float, line.split()))) for line in time_file]
+    shutil.rmtree('testing')
+    assert header == ["generation"] + PHASES + ["total"]
+    assert [row["generation"] for row in rows] == [0, 1, 2]
+    for row in rows:
+        assert min(row.values()) >= 0 and row["evaluation"] > 0 and row["language"] > 0
+        assert abs(sum(row[phase] for phase in PHASES) - row["total"]) < 1e-6
+
+
 def test_save_load_entity():
     """
     Test that saving and loading a population returns the same population
@@ -188,3 +492,107 @@ def test_save_load_entity():
     shutil.rmtree('testing')
     for i, e in enumerate(new_entities):
         assert e.equal_network(population[i])
+
+
+def test_resume_keeps_hidden_units(monkeypatch):
+    """
+    Test that resuming a population keeps the network shape it was saved with,
+    taking only the activation, linearity and parameter type from the given config
+    """
+
+    sim = Simulation(2, 5, 10, 1, "None", optimisation="none")
+    sim.set_io_options(record_language=False, foldername="testing")
+    sim.start(NetworkConfig(hidden_units=[8]))
+    saved = sim.load_entities(1)
+    resumed = []
+    monkeypatch.setattr(sim, "run_population", lambda entities, generation: resumed.append(
+        entities))
+    sim.start_from_generation(1, NetworkConfig(dtype=np.float32))
+    shutil.rmtree('testing')
+    assert resumed[0][0].config == NetworkConfig(hidden_units=[8], dtype=np.float32)
+    for ent, other in zip(resumed[0], saved):
+        assert np.array_equal(ent.genome, other.genome.astype(np.float32))
+        assert [w.shape for w in ent.weights[1:]] == [(8, 14), (5, 8)]
+
+
+def test_start_with_hidden_units(monkeypatch):
+    """
+    Test that starting a population from a list of hidden units gives it the
+    default configuration with those units
+    """
+
+    sim = Simulation(2, 5, 10, 1, "None")
+    started = []
+    monkeypatch.setattr(sim, "run_population", started.append)
+    sim.start([8, 3])
+    assert len(started[0]) == 10
+    assert started[0][0].config == default_config([8, 3])
+    assert all(ent.config is started[0][0].config for ent in started[0])
+
+
+def test_load_mismatched_genome():
+    """
+    Test that loading a genome that does not fit its saved network raises an error
+    """
+
+    sim = Simulation(2, 5, 10, 1, "None")
+    sim.set_io_options(foldername="testing")
+    sim.initialise_io()
+    ent = NeuralEntity(config=NetworkConfig(hidden_units=[8]))
+    ent.config = NetworkConfig()
+    sim.save_entities([ent], 0)
+    try:
+        with pytest.raises(ValueError):
+            sim.load_entities(0)
+    finally:
+        shutil.rmtree('testing')
+
+
+def deduplication_population():
+    """ Returns a population with copies of entities, entities that always do nothing
+    and an entity that always moves forwards
+    """
+
+    entities = [NeuralEntity() for _ in range(6)]
+    for ent in entities[3:5]:
+        ent.biases[-1][:2] = -100
+    entities[5].biases[-1][:2] = 100
+    return entities + [entities[1].copy(), entities[4].copy()]
+
+
+def test_behaviour_classes():
+    """
+    Test that entities are grouped by the actions they choose
+    """
+
+    sim = Simulation(2, 10, 8, 1, "External", optimisation="deduplicate")
+    representatives, classes = sim.behaviour_classes(deduplication_population())
+    first = representatives[classes]
+    assert first[6] == first[1] and first[3] == first[4] == first[7] != first[5]
+    assert (first <= np.arange(8)).all()
+    assert (first[representatives] == representatives).all()
+
+
+def test_deduplicated_generation(monkeypatch):
+    """
+    Test that a deduplicated generation gives each entity the fitness and statistics
+    it gets when run on its own in the shared worlds
+    """
+
+    for optimisation in ["deduplicate", "deduplicate,parallel", "deduplicate,lockstep"]:
+        entities = deduplication_population()
+        sim = Simulation(3, 20, 8, 0, "External", optimisation=optimisation, seed=2)
+        sim.set_io_options(record_language=False, record_entities=False, foldername="testing")
+        runs = []
+        monkeypatch.setattr(sim, "io", lambda *args: runs.append((args[1], args[6])))
+        sim.run_population([ent.copy() for ent in entities])
+        shutil.rmtree('testing')
+
+        ranked, stats = runs[0]
+        worlds = sim.make_world_bank(sim.world_seed(0))
+        for ent, record in zip(ranked, stats):
+            single_stats = EvaluationStats()
+            single = sim.run_single(ent.copy(), stats=single_stats, worlds=worlds)
+            assert ent.fitness == single.fitness == record.fitness
+            assert record == single_stats
+        assert any(record.edible + record.poisonous for record in stats)
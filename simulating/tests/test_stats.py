@@ -0,0 +1,146 @@
+"""
+This module runs all the tests for the statistics recorded while evaluating entities
+"""
+
+import pickle
+import random
+
+import pytest
+
+from simulating import environment
+from simulating import stats as stats_module
+from simulating.entity import NeuralEntity
+from simulating.simulation import Simulation
+from simulating.stats import EvaluationStats
+from simulating.stats import EXIT_REASONS
+from simulating.stats import METRICS
+from simulating.stats import PHASES
+from simulating.stats import PhaseTimes
+from simulating.stats import combine
+
+
+def test_eat():
+    """
+    Test that eating mushrooms counts them by type
+    """
+
+    stats = EvaluationStats()
+    stats.eat(environment.make_edible())
+    stats.eat(environment.make_poisonous())
+    stats.eat(environment.make_poisonous())
+    assert stats.edible == 1 and stats.poisonous == 2
+
+
+def test_end_epoch():
+    """
+    Test that the reasons for epochs ending are counted
+    """
+
+    stats = EvaluationStats()
+    stats.end_epoch("skip_none", 4)
+    stats.end_epoch("completed")
+    stats.end_epoch("skip_none", 3)
+    assert stats.exit_counts() == {
+        reason: {"completed": 1, "skip_none": 2}.get(reason, 0) for reason in EXIT_REASONS
+    }
+    assert stats.saved_counts() == {
+        reason: {"skip_none": 7}.get(reason, 0) for reason in EXIT_REASONS
+    }
+
+
+def test_pickle_round_trip():
+    """
+    Test that statistics survive being sent between processes
+    """
+
+    exits = [0] * len(EXIT_REASONS)
+    exits[:3] = [1, 0, 2]
+    saved = [0] * len(EXIT_REASONS)
+    saved[2] = 25
+    stats = EvaluationStats(-11, 2, 3, 40, exits, saved, 38, 40)
+    assert pickle.loads(pickle.dumps(stats)) == stats
+
+
+def test_combine():
+    """
+    Test that the statistics of a generation are totalled in the order of METRICS
+    """
+
+    first = EvaluationStats(5, 1, 0, 30, [2, 0, 0, 0, 0, 0], [0] * 6, 28, 29)
+    second = EvaluationStats(-11, 0, 1, 12, [0, 1, 1, 0, 0, 0], [0, 7, 11, 0, 0, 0], 12, 13)
+    total = combine([first, second])
+    assert dict(zip(METRICS, total.metrics())) == dict(
+        {name: 0 for name in METRICS}, fitness=-6, edible=1, poisonous=1, steps=42, passes=40,
+        searches=42, exits_completed=2, exits_no_mushrooms=1, exits_skip_none=1,
+        saved_no_mushrooms=7, saved_skip_none=11)
+    assert pickle.loads(pickle.dumps(total)) == total
+    assert total.metrics(second) == [-6, 1, 1] + second.metrics()[3:]
+    assert first.steps == 30
+
+
+def test_phase_times(monkeypatch):
+    """
+    Test that each lap charges the time since the previous lap to its phase
+    """
+
+    clock = iter([1.0, 1.5, 4.0, 4.25])
+    monkeypatch.setattr(stats_module.time, "perf_counter", lambda: next(clock))
+    times = PhaseTimes()
+    times.lap("evaluation")
+    times.lap("language")
+    times.lap("evaluation")
+    assert times.row() == [
+        {"evaluation": 0.75, "language": 2.5}.get(phase, 0.0) for phase in PHASES
+    ] + [3.25]
+
+
+def test_run_single_stats():
+    """
+    Test that the statistics of a simulation are consistent with its fitness and length
+    """
+
+    for optimisation in ["all", "none", "none,detect_cycles"]:
+        sim = Simulation(5, 30, 1, 1, "External", optimisation=optimisation)
+        for _ in range(10):
+            stats = EvaluationStats()
+            entity = sim.run_single(NeuralEntity(3), stats=stats)
+            assert stats.fitness == entity.fitness - 3
+            assert stats.fitness == 10 * stats.edible - 11 * stats.poisonous
+            assert sum(stats.exits) == 5
+            assert stats.steps + sum(stats.saved) == 5 * 30
+            if stats.exit_counts()["completed"] == 5:
+                assert stats.steps == 5 * 30
+
+
+def test_compiled_passes():
+    """
+    Test that a compiled entity counts the inputs of its table as passes, not its lookups
+    """
+
+    sim = Simulation(5, 30, 1, 1, "External", optimisation="none")
+    compiled_sim = Simulation(5, 30, 1, 1, "External", optimisation="none,compile")
+    worlds = sim.make_world_bank(0)
+    entity = NeuralEntity()
+    single, compiled = EvaluationStats(), EvaluationStats()
+    sim.run_single(entity.copy(), stats=single, worlds=worlds)
+    compiled_sim.run_single(entity.copy(), stats=compiled, worlds=worlds)
+    assert single.passes == single.steps == compiled.steps
+    assert compiled.passes == len(sim.observations()) * len(sim.listenings())
+
+
+@pytest.mark.usefixtures("mirrored_worlds")
+def test_run_lockstep_stats_match_run_single():
+    """
+    Test that the lockstep engine records the same statistics as run_single
+    """
+
+    for optimisation in ["all", "none", "all,detect_cycles", "none,detect_cycles"]:
+        sim = Simulation(5, 30, 1, 1, "None", optimisation=optimisation)
+        for seed in range(10):
+            entity = NeuralEntity()
+            single, lockstep = EvaluationStats(), EvaluationStats()
+            random.seed(seed)
+            sim.run_single(entity.copy(), stats=single)
+            random.seed(seed)
+            sim.run_lockstep([entity.copy()], stats=[lockstep])
+            assert single == lockstep